@@ -0,0 +1,123 @@
+"""
+Asyncio serving mode for the PrimePong backend.
+
+Streaming endpoints (/video_feed and /events, and their /tables/<id>/
+variants) are served natively on the event loop, so each viewer is a cheap
+coroutine waiting on the frame broadcaster instead of a thread. Every other
+route is forwarded to the Flask app.
+
+Requires `uvicorn` and `asgiref` (pip install uvicorn asgiref).
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from broadcast import SSE_KEEPALIVE_SECONDS, mjpeg_part, parse_event_id, sse_message
+
+MJPEG_HEADERS = [
+    (b"content-type", b"multipart/x-mixed-replace; boundary=frame"),
+    (b"cache-control", b"no-cache"),
+]
+SSE_HEADERS = [
+    (b"content-type", b"text/event-stream"),
+    (b"cache-control", b"no-cache"),
+    (b"access-control-allow-origin", b"*"),
+]
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def _stream(send, receive, headers, next_chunk):
+    """Sends next_chunk() results as a streaming response until the client leaves."""
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        while True:
+            chunk = asyncio.ensure_future(next_chunk())
+            done, _ = await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                chunk.cancel()
+                return
+            await send({"type": "http.response.body", "body": chunk.result(), "more_body": True})
+    finally:
+        disconnected.cancel()
+
+async def _send_json(send, status, body):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+def _split_table(path):
+    """Splits "/tables/<id>/<route>" into (id, "/<route>"); other paths belong to the first table (None)."""
+    if path.startswith("/tables/"):
+        table_id, _, route = path[len("/tables/"):].partition("/")
+        return table_id, "/" + route
+    return None, path
+
+def create_asgi_app(flask_app, find_tracker, tiers, default_tier):
+    """
+    Returns an ASGI app serving the streaming endpoints natively and everything else through Flask.
+    find_tracker(table_id) returns a table's game tracker (the first table's for None), or None.
+    """
+    from asgiref.wsgi import WsgiToAsgi
+
+    wsgi_app = WsgiToAsgi(flask_app)
+
+    async def video_feed(game_tracker, scope, receive, send):
+        args = parse_qs(scope["query_string"].decode("latin-1"))
+        tier = args.get("tier", [default_tier])[0]
+        if tier not in tiers:
+            await _send_json(send, 400, {"error": f"unknown tier {tier!r}", "tiers": list(tiers)})
+            return
+        broadcaster = game_tracker.frames[tier]
+        last_seq = -1
+
+        async def next_chunk():
+            nonlocal last_seq
+            last_seq, frame = await broadcaster.wait_for_async(last_seq)
+            return mjpeg_part(frame)
+
+        game_tracker.add_viewer(tier)
+        try:
+            await _stream(send, receive, MJPEG_HEADERS, next_chunk)
+        finally:
+            game_tracker.remove_viewer(tier)
+
+    async def events(game_tracker, scope, receive, send):
+        headers = dict(scope["headers"])
+        args = parse_qs(scope["query_string"].decode("latin-1"))
+        last_id = parse_event_id(headers.get(b"last-event-id", b"").decode("latin-1"),
+                                 args.get("last_id", [None])[0])
+        if last_id is None:
+            last_id = game_tracker.events.last_id
+
+        async def next_chunk():
+            nonlocal last_id
+            try:
+                pending = await asyncio.wait_for(game_tracker.events.wait_for_async(last_id),
+                                                 SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                return b": keep-alive\n\n"
+            last_id = pending[-1]["id"]
+            return "".join(sse_message(event) for event in pending).encode()
+
+        await _stream(send, receive, SSE_HEADERS, next_chunk)
+
+    routes = {"/video_feed": video_feed, "/events": events}
+
+    async def app(scope, receive, send):
+        if scope["type"] == "http":
+            table_id, route = _split_table(scope["path"])
+            if route in routes:
+                game_tracker = find_tracker(table_id)
+                if game_tracker is None:
+                    await _send_json(send, 404, {"error": f"unknown table {table_id!r}"})
+                    return
+                await routes[route](game_tracker, scope, receive, send)
+                return
+        await wsgi_app(scope, receive, send)
+
+    return app
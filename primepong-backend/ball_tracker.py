@@ -0,0 +1,107 @@
+import numpy as np
+
+from segmentation import resolution_scale
+
+# --- CONFIGURATION --- #
+# Pixel values are at segmentation.REFERENCE_WIDTH and scale with the frame.
+MIN_WINDOW_PIXELS = 40     # Smallest half-width of the search window.
+WINDOW_RADIUS_SCALE = 4.0  # Window half-width in multiples of the ball radius.
+MISS_GROWTH_PIXELS = 30    # Extra half-width added for every frame the ball is missed.
+MAX_MISSES = 3             # Missed frames before the track is dropped.
+
+# --- BALL TRACKER CLASS --- #
+class BallTracker:
+    """
+    Predictive region-of-interest tracker for the ball.
+
+    Keeps an alpha-beta motion model (position and velocity per frame) and
+    only asks the detector to search a window around the predicted position.
+    A full-frame search is done only when there is no track, or when the ball
+    is lost from the window; after `max_misses` frames without the ball
+    anywhere, the track is dropped.
+
+    `detect_func(ctx, roi)` must return ((x, y), radius) in frame coordinates,
+    or (None, None); `roi` is (x0, y0, x1, y1) or None for the full frame.
+    """
+
+    def __init__(self, detect_func, alpha=0.85, beta=0.5, max_misses=MAX_MISSES):
+        self.detect_func = detect_func
+        self.alpha = alpha
+        self.beta = beta
+        self.max_misses = max_misses
+        self.reset()
+
+    def reset(self):
+        """Drop the current track so the next frame does a full-frame search."""
+        self.position = None              # Filtered position (x, y).
+        self.velocity = np.zeros(2)       # Pixels per frame.
+        self.radius = 0
+        self.misses = 0
+        self.last_roi = None              # Window searched on the last frame (None = full frame).
+
+    @property
+    def tracking(self):
+        return self.position is not None
+
+    def predict(self):
+        """Predicted ball position for the next frame."""
+        return self.position + self.velocity
+
+    def search_window(self, frame_shape):
+        """Search window (x0, y0, x1, y1) around the predicted position, clipped to the frame."""
+        h, w = frame_shape[:2]
+        px, py = self.predict()
+        speed = np.abs(self.velocity)
+        scale = resolution_scale(frame_shape)
+        base = (max(MIN_WINDOW_PIXELS * scale, WINDOW_RADIUS_SCALE * self.radius)
+                + self.misses * MISS_GROWTH_PIXELS * scale)
+        half_x = base + speed[0]
+        half_y = base + speed[1]
+        x0 = int(max(px - half_x, 0))
+        y0 = int(max(py - half_y, 0))
+        x1 = int(min(px + half_x, w))
+        y1 = int(min(py + half_y, h))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def update(self, ctx):
+        """Detects the ball in the frame context and returns its center and radius."""
+        roi = self.search_window(ctx.shape) if self.tracking else None
+        if self.tracking and roi is None:
+            # Prediction left the frame: treat as a loss.
+            self.reset()
+        self.last_roi = roi
+        center, radius = self.detect_func(ctx, roi)
+        if center is None and roi is not None:
+            # Lost from the window (e.g. a sharp change of direction): fall back
+            # to a full-frame search before coasting on the motion model.
+            self.last_roi = None
+            center, radius = self.detect_func(ctx, None)
+            if center is not None:
+                # Reacquired away from the prediction; restart the motion model.
+                self.reset()
+
+        if center is None:
+            if self.tracking:
+                self.misses += 1
+                if self.misses > self.max_misses:
+                    self.reset()
+                else:
+                    # Coast on the motion model so the window follows the ball.
+                    self.position = self.predict()
+            return None, None
+
+        measured = np.array(center, dtype="float64")
+        if self.tracking:
+            predicted = self.predict()
+            residual = measured - predicted
+            self.position = predicted + self.alpha * residual
+            # The residual built up over every coasted frame, not just this one.
+            self.velocity = self.velocity + self.beta * residual / (self.misses + 1)
+        else:
+            self.position = measured
+            self.velocity = np.zeros(2)
+        self.radius = radius
+        self.misses = 0
+        return center, radius
@@ -0,0 +1,200 @@
+"""
+Speed and accuracy benchmark for the vision pipeline, on synthetic scenes.
+
+Runs the same per-frame steps as the detection loop (lighting correction,
+table markers, ball, trajectory and out-of-play scoring, JPEG encode) over
+a scripted synthetic match at several resolutions and frame rates, and
+reports per-stage throughput alongside ball, side, table and scoring
+accuracy against the scene's ground truth, with the reasons the judge gave
+for the points it called. Low frame rates matter for scoring: fast bounces
+can fall between frames.
+
+    python benchmark.py
+    python benchmark.py --resolutions 1280x720,1920x1080 --fps 30 --points 3 --json
+"""
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+import opencv
+from detection import DetectionCore
+from scoring import OutOfPlayJudge
+from segmentation import resolution_scale
+from synthetic_scene import SyntheticScene
+from trajectory import Trajectory
+
+STAGES = ("lighting", "markers", "ball", "scoring", "encode", "loop")
+SCORE_MATCH_SLACK_SECONDS = 2.0  # How late after the expected delay a score may arrive and still match.
+SCORE_EARLY_SECONDS = 0.25       # How early a score may arrive (a ball beyond returning distance is called in view).
+
+# --- SINGLE RUN --- #
+def run_scene(scene, tracking=True, table_lock=True, coarse=True):
+    """Runs the detection steps over every frame of scene; returns (timings, observations)."""
+    core = DetectionCore(ball_tracking=tracking, table_lock=table_lock, coarse=coarse)
+    trajectory = Trajectory()
+    judge = OutOfPlayJudge(opencv.DELAY_SECONDS, opencv.OUT_OF_PLAY_CONFIDENCE)
+    timings = {stage: [] for stage in STAGES}
+    observations = []
+
+    for index, timestamp, frame in scene.frames():
+        t0 = time.perf_counter()
+        results = core.process(frame)
+        t3 = time.perf_counter()
+        table_vertices = results["table_vertices"]
+        ball_center = results["ball_center"]
+        side = results.get("side")
+        kind = trajectory.update(timestamp, ball_center, resolution_scale(frame.shape),
+                                 results.get("ball_cm"), results.get("zone"), side)
+        winner = judge.update(timestamp, results, trajectory, kind, frame.shape)
+        t4 = time.perf_counter()
+        cv2.imencode('.jpg', frame)
+        t5 = time.perf_counter()
+
+        for step, elapsed in core.timings.items():
+            timings[step].append(elapsed)
+        for stage, elapsed in (("scoring", t4 - t3), ("encode", t5 - t4), ("loop", t5 - t0)):
+            timings[stage].append(elapsed)
+        observations.append({
+            "index": index, "time": timestamp, "table": table_vertices,
+            "ball": ball_center, "side": side, "winner": winner,
+            "reason": judge.last_call["reason"] if winner is not None else None,
+        })
+    return timings, observations
+
+# --- ACCURACY --- #
+def score_accuracy(scene, observations, delay_seconds):
+    """
+    Matches detected score events to the scene's ground-truth points (the
+    moment the ball left the view); latencies are negative for calls made
+    before that.
+    """
+    detected = [(obs["time"], obs["winner"], obs["reason"]) for obs in observations if obs["winner"] is not None]
+    matched, wrong_winner, latencies = 0, 0, []
+    reasons = {}
+    used = set()
+    for truth in scene.events:
+        window_end = truth["time"] + delay_seconds + SCORE_MATCH_SLACK_SECONDS
+        for i, (t, winner, reason) in enumerate(detected):
+            if i in used or not truth["time"] - SCORE_EARLY_SECONDS <= t <= window_end:
+                continue
+            used.add(i)
+            if winner == truth["winner"]:
+                matched += 1
+                latencies.append(t - truth["time"])
+                reasons[reason] = reasons.get(reason, 0) + 1
+            else:
+                wrong_winner += 1
+            break
+    return {
+        "points": len(scene.events),
+        "matched": matched,
+        "wrong_winner": wrong_winner,
+        "missed": len(scene.events) - matched - wrong_winner,
+        "spurious": len(detected) - len(used),
+        "mean_latency_s": float(np.mean(latencies)) if latencies else None,
+        "reasons": reasons,
+    }
+
+def accuracy(scene, observations, delay_seconds):
+    """Ball, side, table and scoring accuracy of observations against ground truth."""
+    tp = fp = fn = 0
+    errors = []
+    side_total = side_correct = 0
+    corner_errors = []
+    for obs in observations:
+        truth = scene.truth(obs["index"])
+        if obs["table"] is not None:
+            corner_errors.append(np.abs(np.array(obs["table"]) - truth["corners"]).max())
+        if truth["ball"] is None:
+            fp += obs["ball"] is not None
+            continue
+        if obs["ball"] is None:
+            fn += 1
+            continue
+        error = float(np.hypot(obs["ball"][0] - truth["ball"][0], obs["ball"][1] - truth["ball"][1]))
+        if error <= max(2 * truth["ball_radius"], 4):
+            tp += 1
+            errors.append(error)
+        else:
+            fp += 1
+            fn += 1
+        if obs["side"] is not None:
+            side_total += 1
+            side_correct += obs["side"] == truth["side"]
+    return {
+        "ball_recall": tp / max(tp + fn, 1),
+        "ball_precision": tp / max(tp + fp, 1),
+        "ball_error_px": float(np.mean(errors)) if errors else None,
+        "side_accuracy": side_correct / max(side_total, 1),
+        "table_max_corner_error_px": float(np.max(corner_errors)) if corner_errors else None,
+        "scoring": score_accuracy(scene, observations, delay_seconds),
+    }
+
+# --- REPORT --- #
+def summarize(timings):
+    """Frames/s (from the mean) and p95 latency in ms for each stage."""
+    return {stage: {"fps": 1.0 / max(np.mean(values), 1e-9),
+                    "p95_ms": float(np.percentile(values, 95) * 1000.0)}
+            for stage, values in timings.items()}
+
+def print_report(results):
+    names = list(results)
+    print("Throughput (frames/s, p95 ms)")
+    print(f"{'stage':<10}" + "".join(f"{name:>22}" for name in names))
+    for stage in STAGES:
+        row = "".join(f"{results[name]['speed'][stage]['fps']:>12.1f}"
+                      f"{results[name]['speed'][stage]['p95_ms']:>10.2f}" for name in names)
+        print(f"{stage:<10}{row}")
+    print()
+    print("Accuracy")
+    for name in names:
+        acc = results[name]["accuracy"]
+        score = acc["scoring"]
+        latency = score["mean_latency_s"]
+        print(f"{name}: ball recall={acc['ball_recall']:.3f} precision={acc['ball_precision']:.3f} "
+              f"error={acc['ball_error_px'] or 0:.1f}px side={acc['side_accuracy']:.3f} "
+              f"table={acc['table_max_corner_error_px'] or 0:.1f}px | points {score['matched']}/{score['points']} "
+              f"wrong={score['wrong_winner']} spurious={score['spurious']} "
+              f"latency={'n/a' if latency is None else f'{latency:.2f}s'} "
+              f"calls={','.join(f'{reason}:{n}' for reason, n in sorted(score['reasons'].items())) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PrimePong vision pipeline on synthetic scenes.")
+    parser.add_argument("--resolutions", default="640x360,1280x720,1920x1080",
+                        help="Comma-separated WIDTHxHEIGHT list.")
+    parser.add_argument("--fps", default="60,30", help="Comma-separated frame rates of the synthetic video.")
+    parser.add_argument("--points", type=int, default=2, help="Scripted points per scene.")
+    parser.add_argument("--noise", type=float, default=4.0, help="Sensor noise sigma.")
+    parser.add_argument("--lighting", type=float, default=0.25, help="Lighting variation amplitude.")
+    parser.add_argument("--perspective", type=float, default=0.0, help="Perspective tilt of the table (0-1).")
+    parser.add_argument("--no-tracking", action="store_true", help="Search the full frame for the ball every frame.")
+    parser.add_argument("--no-table-lock", action="store_true", help="Detect the table markers on every frame.")
+    parser.add_argument("--no-coarse", action="store_true", help="Segment at full resolution only.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    for resolution in args.resolutions.split(","):
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        for fps in (int(v) for v in args.fps.split(",")):
+            scene = SyntheticScene(width, height, fps=fps, points=args.points, noise_sigma=args.noise,
+                                   lighting_variation=args.lighting, perspective=args.perspective, seed=args.seed)
+            timings, observations = run_scene(scene, tracking=not args.no_tracking,
+                                              table_lock=not args.no_table_lock, coarse=not args.no_coarse)
+            results[f"{resolution}@{fps}"] = {
+                "frames": scene.frame_count,
+                "speed": summarize(timings),
+                "accuracy": accuracy(scene, observations, opencv.DELAY_SECONDS),
+            }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import asyncio
+import collections
+import itertools
+import json
+import threading
+import time
+
+def mjpeg_part(frame):
+    """Wraps one JPEG frame as a multipart/x-mixed-replace part."""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+
+SSE_KEEPALIVE_SECONDS = 15  # Seconds between keep-alive comments on idle event streams.
+
+def parse_event_id(*candidates):
+    """First usable event id among candidates (e.g. Last-Event-ID header, ?last_id=), else None."""
+    for value in candidates:
+        if value:
+            try:
+                return int(value)
+            except ValueError:
+                pass
+    return None
+
+def sse_message(event):
+    """Formats an EventStream event as a Server-Sent Events message."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+# --- BROADCASTER BASE CLASS --- #
+class _Broadcaster:
+    """Condition shared by publishers and blocking or asyncio waiters."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._async_waiters = set()   # (loop, asyncio.Event) pairs of waiting tasks.
+
+    def _wake_all(self):
+        """Wakes every waiter. Must be called with self._cond held."""
+        self._cond.notify_all()
+        waiters = self._async_waiters
+        self._async_waiters = set()
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # Loop already closed.
+
+    def _wait(self, ready, result, timeout):
+        with self._cond:
+            if not self._cond.wait_for(ready, timeout):
+                return None
+            return result()
+
+    async def _wait_async(self, ready, result):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if ready():
+                    return result()
+                event = asyncio.Event()
+                self._async_waiters.add((loop, event))
+            await event.wait()
+
+# --- FRAME BROADCASTER CLASS --- #
+class FrameBroadcaster(_Broadcaster):
+    """
+    Versioned single-slot buffer that fans the latest frame out to every viewer.
+
+    Each published frame carries a sequence number. Viewers remember the last
+    sequence they sent and block (thread or asyncio task) until a newer frame
+    exists, so nobody spins, and a slow viewer simply skips to the newest
+    frame instead of queueing old ones. Viewers register themselves, so the
+    publisher can skip producing frames nobody is watching.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.seq = -1
+        self.data = None
+        self.viewers = 0
+
+    def add_viewer(self):
+        with self._cond:
+            self.viewers += 1
+
+    def remove_viewer(self):
+        with self._cond:
+            self.viewers -= 1
+
+    def publish(self, seq, data):
+        """Publishes a frame; frames older than the current one are ignored."""
+        with self._cond:
+            if seq <= self.seq:
+                return False
+            self.seq = seq
+            self.data = data
+            self._wake_all()
+        return True
+
+    def latest(self):
+        """Returns (seq, data) of the newest frame."""
+        with self._cond:
+            return self.seq, self.data
+
+    def wait_for(self, last_seq, timeout=None):
+        """
+        Blocks until a frame newer than last_seq is published.
+        Returns (seq, data), or (last_seq, None) on timeout.
+        """
+        result = self._wait(lambda: self.seq > last_seq, lambda: (self.seq, self.data), timeout)
+        return result if result is not None else (last_seq, None)
+
+    async def wait_for_async(self, last_seq):
+        """Asyncio version of wait_for, without a thread per waiting viewer."""
+        return await self._wait_async(lambda: self.seq > last_seq, lambda: (self.seq, self.data))
+
+# --- EVENT STREAM CLASS --- #
+class EventStream(_Broadcaster):
+    """
+    Append-only stream of game events delivered to every subscriber.
+
+    Each event gets a monotonic id. Subscribers keep the last id they saw and
+    ask for everything after it, so no event is overwritten or consumed by
+    another client, and a reconnecting client resumes from its last id as
+    long as the event is still within the retained history.
+
+    With a journal, every event is also appended to it and ids carry on from
+    the journal after a restart. Nothing is preloaded: only a client resuming
+    from an id older than the events in memory reads the gap back from the
+    journal, up to `history` events.
+    """
+
+    def __init__(self, history=1024, journal=None):
+        super().__init__()
+        self.journal = journal
+        self.history = history
+        self.last_id = journal.last_id if journal is not None else 0
+        self._ids = itertools.count(self.last_id + 1)
+        self._events = collections.deque(maxlen=history)
+
+    def publish(self, event_type, **data):
+        """Appends an event and wakes every subscriber. Returns the event dict."""
+        with self._cond:
+            event = {"id": next(self._ids), "type": event_type, "timestamp": time.time()}
+            event.update(data)
+            self._events.append(event)
+            self.last_id = event["id"]
+            if self.journal is not None:
+                self.journal.append(event)
+            self._wake_all()
+        return event
+
+    def _since(self, last_id):
+        """Events in memory after last_id. Must be called with self._cond held."""
+        if not self._events or last_id >= self.last_id:
+            return []
+        # Ids are contiguous, so the first wanted event is found by offset.
+        start = max(last_id - self._events[0]["id"] + 1, 0)
+        return list(itertools.islice(self._events, start, None))
+
+    def _journal_gap(self, last_id):
+        """
+        (since_id, first id in memory) of the events after last_id that are
+        only in the journal, or None. Must be called with self._cond held.
+        """
+        first = self._events[0]["id"] if self._events else self.last_id + 1
+        if self.journal is None or last_id + 1 >= first:
+            return None
+        return max(last_id, self.last_id - self.history), first
+
+    def _from_journal(self, last_id):
+        """
+        Events after last_id that are older than the events in memory (e.g.
+        from before a restart), read from the journal without holding the
+        lock, so publishers never wait on the disk.
+        """
+        with self._cond:
+            gap = self._journal_gap(last_id)
+        if gap is None:
+            return []
+        since_id, first = gap
+        return list(itertools.takewhile(lambda event: event["id"] < first, self.journal.replay(since_id)))
+
+    def since(self, last_id):
+        """Returns the retained events with an id greater than last_id."""
+        events = self._from_journal(last_id)
+        if events:
+            last_id = events[-1]["id"]
+        with self._cond:
+            return events + self._since(last_id)
+
+    def wait_for(self, last_id, timeout=None):
+        """Blocks until events newer than last_id exist; returns them ([] on timeout)."""
+        events = self._from_journal(last_id)
+        if events:
+            return events
+        result = self._wait(lambda: self.last_id > last_id, lambda: self._since(last_id), timeout)
+        return result if result is not None else []
+
+    async def wait_for_async(self, last_id):
+        """Asyncio version of wait_for; journal reads run on a worker thread."""
+        with self._cond:
+            gap = self._journal_gap(last_id)
+        if gap is not None:
+            events = await asyncio.to_thread(self._from_journal, last_id)
+            if events:
+                return events
+        return await self._wait_async(lambda: self.last_id > last_id, lambda: self._since(last_id))
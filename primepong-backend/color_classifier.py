@@ -0,0 +1,82 @@
+import sys
+
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+QUANT_BITS = 5             # Bits kept per BGR channel in the lookup table.
+
+# Class ids of the label image.
+BACKGROUND = 0
+MARKER = 1
+BALL = 2
+PADDLE = 3
+CLASS_IDS = {"marker": MARKER, "ball": BALL, "paddle": PADDLE}
+
+# Colour profiles: class name -> list of (lower, upper) HSV ranges (OpenCV
+# scale, H in 0-179). Earlier classes win where ranges overlap.
+DEFAULT_PROFILES = {
+    "marker": [((100, 150, 50), (140, 255, 255))],   # Blue corner stickers.
+    "ball": [((0, 80, 80), (25, 255, 255))],         # Orange ball.
+    "paddle": [((10, 30, 80), (30, 79, 255))],       # Bare wooden blade; calibrate for your paddles.
+}
+
+# --- COLOR CLASSIFIER CLASS --- #
+class ColorClassifier:
+    """
+    Classifies every pixel of a BGR frame with one table lookup.
+
+    The table maps each quantized BGR colour to a class id and is built once
+    from the colour profiles (via an HSV conversion of the bin centres), so
+    classifying a frame needs no HSV conversion and no per-class inRange.
+    It is only rebuilt by `recalibrate`.
+
+    The lookup index is the BGRA pixel read as one little-endian uint32
+    (R << 16 | G << 8 | B), shifted and masked to QUANT_BITS per channel.
+    """
+
+    def __init__(self, profiles=None):
+        if sys.byteorder != "little":
+            raise RuntimeError("ColorClassifier needs a little-endian machine.")
+        self.version = 0
+        self.recalibrate(profiles or DEFAULT_PROFILES)
+
+    def recalibrate(self, profiles):
+        """Rebuilds the lookup table from class name -> [(lower, upper), ...] HSV ranges."""
+        shift = 8 - QUANT_BITS
+        levels = 1 << QUANT_BITS
+        q = np.arange(levels, dtype=np.uint32)
+        b, g, r = np.meshgrid(q, q, q, indexing="ij")
+        centres = np.stack([b, g, r], axis=-1).reshape(-1, 1, 3)
+        centres = ((centres << shift) + (1 << shift) // 2).astype(np.uint8)
+        hsv = cv2.cvtColor(centres, cv2.COLOR_BGR2HSV)
+
+        classes = np.full(len(hsv), BACKGROUND, dtype=np.uint8)
+        unassigned = np.ones(len(hsv), dtype=bool)
+        for name, ranges in profiles.items():
+            hit = np.zeros(len(hsv), dtype=bool)
+            for lower, upper in ranges:
+                hit |= cv2.inRange(hsv, np.array(lower), np.array(upper)).ravel() > 0
+            hit &= unassigned
+            classes[hit] = CLASS_IDS[name]
+            unassigned &= ~hit
+
+        index = (r.ravel() << 16) | (g.ravel() << 8) | b.ravel()
+        mask = (levels - 1) * 0x010101
+        table = np.zeros(mask + 1, dtype=np.uint8)
+        table[index] = classes
+        self.profiles = {name: list(ranges) for name, ranges in profiles.items()}
+        self._table = table
+        self._mask = mask
+        self._shift = shift
+        self.version += 1
+
+    def classify(self, bgr):
+        """Label image (uint8 class ids) of a BGR frame or region."""
+        bgra = cv2.cvtColor(bgr, cv2.COLOR_BGR2BGRA)
+        index = bgra.view(np.uint32)[..., 0]
+        index >>= self._shift
+        index &= self._mask
+        return np.take(self._table, index)
+
+DEFAULT_CLASSIFIER = ColorClassifier()
@@ -0,0 +1,124 @@
+"""
+Detection core shared by the server, the standalone tracker, the camera
+processes and the benchmark: table markers, ball and the ball's place on the
+table for one camera, plus drawing the results onto a frame.
+"""
+import time
+
+import cv2
+
+from ball_tracker import BallTracker
+from color_classifier import BALL
+from frame_context import FrameContext
+from segmentation import find_blobs, resolution_scale
+from table_detector import TableDetector
+from table_geometry import GREEN_PADDING_CM, PURPLE_PADDING_CM, TableGeometry
+
+# --- BALL DETECTION --- #
+def detect_orange_ball(ctx, roi=None, coarse=True):
+    """
+    Detects the orange ball in the frame context and returns its center and radius.
+    If roi (x0, y0, x1, y1) is given, only that region is searched.
+    """
+    # Only the largest candidate is refined at full resolution: the ball is the largest orange blob.
+    contours = find_blobs(ctx, BALL, roi=roi, coarse=coarse, limit=1)
+    if len(contours) == 0:
+        return None, None
+    largest_contour = max(contours, key=cv2.contourArea)
+    ((x, y), radius) = cv2.minEnclosingCircle(largest_contour)
+    if radius < 2 * resolution_scale(ctx.shape):
+        return None, None
+    return (int(x), int(y)), int(radius)
+
+# --- DETECTION CORE CLASS --- #
+class DetectionCore:
+    """
+    Per-camera table and ball detection.
+
+    `process(frame)` returns the frame's results: "table_vertices",
+    "ball_center" and "ball_radius", plus "outlines" once the table is known
+    and "side", "zone" and "ball_cm" when the ball is seen over a known table.
+    `timings` holds the seconds spent on the last frame's lighting, markers
+    and ball steps.
+    """
+
+    def __init__(self, ball_tracking=True, table_lock=True, coarse=True,
+                 green_padding_cm=GREEN_PADDING_CM, purple_padding_cm=PURPLE_PADDING_CM):
+        self.coarse = coarse
+        self.detector = TableDetector(lock=table_lock, coarse=coarse)
+        # Homography and region label map, rebuilt when the table geometry changes.
+        self.geometry = TableGeometry(green_padding_cm, purple_padding_cm)
+        self.ball_tracker = BallTracker(self.detect_ball) if ball_tracking else None
+        self.timings = {}
+
+    def detect_ball(self, ctx, roi=None):
+        return detect_orange_ball(ctx, roi, self.coarse)
+
+    @property
+    def locked(self):
+        return self.detector.locked
+
+    def unlock(self):
+        """Drops the table lock so the markers are detected afresh."""
+        self.detector.unlock()
+
+    def process(self, frame):
+        """Detects the table and ball in a BGR frame; returns the results dict."""
+        t0 = time.perf_counter()
+        # Lighting correction and colour labels are computed once and shared by both detectors;
+        # the equalization table comes from the coarse frame and is applied where they look.
+        ctx = FrameContext(frame, coarse=self.coarse)
+        t1 = time.perf_counter()
+        table_vertices = self.detector.process_frame(ctx)
+        geometry = self.geometry.update(table_vertices, self.detector.geometry_version, frame.shape)
+        t2 = time.perf_counter()
+        if self.ball_tracker is not None:
+            ball_center, ball_radius = self.ball_tracker.update(ctx)
+        else:
+            ball_center, ball_radius = self.detect_ball(ctx)
+        t3 = time.perf_counter()
+
+        results = {"table_vertices": table_vertices, "ball_center": ball_center, "ball_radius": ball_radius}
+        if table_vertices is not None:
+            results["outlines"] = (geometry.green_outline, geometry.purple_outline)
+            if ball_center is not None:
+                results["side"] = geometry.side(ball_center)
+                results["zone"] = geometry.zone(ball_center)
+                results["ball_cm"] = geometry.to_table_cm(ball_center)
+        self.timings = {"lighting": t1 - t0, "markers": t2 - t1, "ball": t3 - t2}
+        return results
+
+# --- ANNOTATION --- #
+def annotate(frame, results):
+    """Draws detection (and scoring) results onto the frame in place."""
+    table_vertices = results["table_vertices"]
+    ball_center = results["ball_center"]
+
+    # Draw table boundaries if detected.
+    if table_vertices is not None:
+        green_outline, purple_outline = results["outlines"]
+
+        # Draw green table outline with 1 cm padding.
+        cv2.polylines(frame, [green_outline], True, (0, 255, 0), 3)
+
+        # Draw purple padded outline with 5 cm padding.
+        cv2.polylines(frame, [purple_outline], True, (128, 0, 128), 2)
+
+        # Draw table vertices.
+        for vertex in table_vertices:
+            cv2.circle(frame, tuple(vertex), 5, (0, 0, 255), -1)
+
+    if ball_center is not None:
+        cv2.circle(frame, ball_center, results["ball_radius"], (0, 165, 255), 2)
+        if "side" in results:
+            cv2.putText(frame, f"Side: {results['side']} ({results['zone']})", (50, 90),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            cv2.putText(frame, "Ball Detected", (50, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        if "speed_cm_s" in results:
+            cv2.putText(frame, f"Speed: {results['speed_cm_s'] * 0.036:.1f} km/h", (50, 130),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    elif "undetected_elapsed" in results:
+        cv2.putText(frame, f"Undetected: {results['undetected_elapsed']:.1f}s", (50, 130),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    return frame
@@ -0,0 +1,259 @@
+"""
+Detection pool: the table and ball detection of many tables on a shared
+set of worker processes.
+
+Detection state (table lock, ball track, geometry) is per table and every
+frame builds on the last, so each table is pinned to one worker and keeps
+its DetectionCore there; tables are spread evenly over the workers, one per
+worker until the cores run out. Frames travel through a one-frame
+shared-memory slot per table and only their results come back.
+
+Each table has at most one frame in flight: its detection thread waits for
+the result before submitting the next frame, and newer frames replace older
+ones in the table's own drop-oldest queue meanwhile. A worker's queue thus
+holds at most one frame per table and serves them in arrival order, so
+tables sharing a worker take turns and a slow table only delays itself.
+A frame whose detection raises is answered with no results, and a worker
+process that dies is restarted with fresh detection state for its tables,
+so one bad table cannot starve the others.
+"""
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from multi_camera import SharedFrameRing
+
+# --- CONFIGURATION --- #
+RESULT_TIMEOUT_SECONDS = 5.0   # A frame whose result takes longer is given up on.
+WORKER_CHECK_SECONDS = 1.0     # How often dead worker processes are looked for and restarted.
+
+def default_workers():
+    """One worker per core available to this process, leaving one for capture, encoding and serving."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores - 1)
+
+# --- WORKER PROCESS --- #
+def pool_worker(requests, results):
+    """
+    Detection loop of one pool worker; results is the write end of the
+    worker's own pipe, so a worker that dies mid-write blocks nobody else.
+
+    Handles ("add", table, options), ("unlock", table), ("frame", table, seq,
+    ring_name, shape) and ("stop",) messages; every frame is answered with
+    (table, seq, results, timings, locked), with results None when its
+    detection raised.
+    """
+    from detection import DetectionCore
+
+    cores = {}
+    rings = {}
+    while True:
+        message = requests.get()
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "add":
+            _, table, options = message
+            cores[table] = DetectionCore(**options)
+        elif kind == "unlock":
+            cores[message[1]].unlock()
+        elif kind == "frame":
+            _, table, seq, ring_name, shape = message
+            core = cores.get(table)
+            try:
+                ring = rings.get(table)
+                if ring is None or ring.name != ring_name:
+                    if ring is not None:
+                        ring.close()
+                    ring = rings[table] = SharedFrameRing(shape, slots=1, name=ring_name)
+                # The table waits for this result before writing its next frame, so detect in place.
+                detected = core.process(ring.frames[0])
+            except Exception:
+                print(f"Detection of table {table} failed on frame {seq}:")
+                traceback.print_exc()
+                results.send((table, seq, None, {}, core.locked if core is not None else False))
+                continue
+            results.send((table, seq, detected, core.timings, core.locked))
+    for ring in rings.values():
+        ring.close()
+
+# --- POOLED DETECTOR --- #
+class PooledDetector:
+    """
+    Stand-in for a table's DetectionCore that runs its detection on the pool.
+
+    `process(frame)` blocks until the pinned worker returns the results, or
+    returns None after `timeout` seconds. A frame that timed out may still be
+    read from the shared slot, so the next call first waits for its result
+    and skips its own frame (returns None) if that result is still missing.
+    `timings` adds "pool_wait", the time the frame spent queued and in transit.
+    """
+
+    def __init__(self, pool, table_id, worker):
+        self.pool = pool
+        self.table_id = table_id
+        self.worker = worker
+        self.timings = {}
+        self.locked = False
+        self._ring = None
+        self._seq = 0
+        self._result_seq = 0
+        self._result = None
+        self._cond = threading.Condition()
+
+    def process(self, frame, timeout=RESULT_TIMEOUT_SECONDS):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._result_seq >= self._seq, timeout):
+                return None
+        if self._ring is None or self._ring.shape != frame.shape:
+            if self._ring is not None:
+                self._ring.close()
+            self._ring = SharedFrameRing(frame.shape, slots=1)
+        self._seq += 1
+        seq = self._seq
+        np.copyto(self._ring.frames[0], frame)
+        start = time.perf_counter()
+        self.pool._send(self.worker, ("frame", self.table_id, seq, self._ring.name, frame.shape))
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._result_seq >= seq, timeout):
+                return None
+            results, timings, self.locked = self._result
+        elapsed = time.perf_counter() - start
+        self.timings = dict(timings, pool_wait=max(elapsed - sum(timings.values()), 0.0))
+        return results
+
+    def unlock(self):
+        self.locked = False
+        self.pool._send(self.worker, ("unlock", self.table_id))
+
+    def _deliver(self, seq, payload):
+        with self._cond:
+            self._result_seq = seq
+            self._result = payload
+            self._cond.notify_all()
+
+    def _release(self):
+        """Answers the frame in flight with no results, after its worker died."""
+        with self._cond:
+            if self._result_seq < self._seq:
+                self._result_seq = self._seq
+                self._result = (None, {}, False)
+                self._cond.notify_all()
+
+    def close(self):
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+# --- DETECTION POOL CLASS --- #
+class DetectionPool:
+    """
+    Worker processes running the detection of every table added to the pool.
+
+    `add_table(table_id, **options)` pins the table to the worker with the
+    fewest tables and returns its PooledDetector; options are passed to the
+    table's DetectionCore in the worker. A worker process found dead is
+    restarted and its tables are added to it again.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_workers()
+        self.tables = {}                  # table id -> PooledDetector
+        self.frames = [0] * self.workers  # Frames detected by each worker.
+        self.restarts = 0                 # Worker processes restarted after dying.
+        self._options = {}                # table id -> DetectionCore options
+        self._ctx = multiprocessing.get_context("spawn")
+        self._requests = [self._ctx.Queue() for _ in range(self.workers)]
+        self._readers = [None] * self.workers     # Read end of each worker's result pipe.
+        self._processes = [None] * self.workers
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        for worker in range(self.workers):
+            self._start_worker(worker)
+        self._thread = threading.Thread(target=self._dispatch, name="detect-results", daemon=True)
+        self._thread.start()
+        return self
+
+    def _start_worker(self, worker):
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(target=pool_worker, args=(self._requests[worker], writer),
+                                    name=f"detect-{worker}", daemon=True)
+        process.start()
+        writer.close()
+        self._readers[worker] = reader
+        self._processes[worker] = process
+
+    def add_table(self, table_id, **options):
+        load = [0] * self.workers
+        for detector in self.tables.values():
+            load[detector.worker] += 1
+        worker = load.index(min(load))
+        detector = self.tables[table_id] = PooledDetector(self, table_id, worker)
+        self._options[table_id] = options
+        self._send(worker, ("add", table_id, options))
+        return detector
+
+    def _send(self, worker, message):
+        self._requests[worker].put(message)
+
+    def _dispatch(self):
+        next_check = time.monotonic() + WORKER_CHECK_SECONDS
+        while not self._stopping:
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + WORKER_CHECK_SECONDS
+            readers = [reader for reader in self._readers if reader is not None]
+            for reader in multiprocessing.connection.wait(readers, WORKER_CHECK_SECONDS):
+                try:
+                    message = reader.recv()
+                except (EOFError, OSError):
+                    # The worker is gone; _check_workers restarts it.
+                    self._readers[self._readers.index(reader)] = None
+                    reader.close()
+                    continue
+                table_id, seq, results, timings, locked = message
+                detector = self.tables[table_id]
+                self.frames[detector.worker] += 1
+                detector._deliver(seq, (results, timings, locked))
+
+    def _check_workers(self):
+        """Restarts dead workers with fresh detection state for their tables."""
+        for worker, process in enumerate(self._processes):
+            if self._stopping or process.is_alive():
+                continue
+            print(f"Detection worker {worker} died (exit code {process.exitcode}); restarting it.")
+            self.restarts += 1
+            if self._readers[worker] is not None:
+                self._readers[worker].close()
+            # Frames queued for the dead process are dropped with its queue.
+            self._requests[worker] = self._ctx.Queue()
+            self._start_worker(worker)
+            for table_id, detector in self.tables.items():
+                if detector.worker == worker:
+                    self._send(worker, ("add", table_id, self._options[table_id]))
+                    detector.locked = False
+                    detector._release()
+
+    def stop(self):
+        self._stopping = True
+        for requests in self._requests:
+            requests.put(("stop",))
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join(timeout=2 * WORKER_CHECK_SECONDS)
+        for reader in self._readers:
+            if reader is not None:
+                reader.close()
+        for detector in self.tables.values():
+            detector.close()
@@ -0,0 +1,120 @@
+import cv2
+import numpy as np
+
+from color_classifier import DEFAULT_CLASSIFIER
+
+# --- CONFIGURATION --- #
+COARSE_WIDTH = 640    # Width of the downscaled frame used for coarse candidate search.
+
+# --- UTILITY FUNCTIONS --- #
+def lighting_lut(frame):
+    """Histogram-equalization lookup table (as cv2.equalizeHist builds it) for the luma of a BGR frame."""
+    luma = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb)[:, :, 0]
+    hist = cv2.calcHist([luma], [0], None, [256], [0, 256]).ravel()
+    first = int(np.flatnonzero(hist)[0])
+    total = hist.sum()
+    if hist[first] == total:
+        return np.full(256, first, dtype=np.uint8)
+    cdf = np.cumsum(hist) - hist[first]
+    lut = np.rint(cdf * (255.0 / (total - hist[first])))
+    lut[:first] = 0
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+def adjust_lighting(frame, lut=None):
+    """
+    Adjust lighting using histogram equalization on the Y channel of YCrCb.
+    With `lut` (from lighting_lut) the equalization of another frame, e.g. a
+    downscaled copy, is applied instead of building one from this frame.
+    """
+    ycrcb = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb)
+    # Equalize the luma plane in place instead of a split/merge round trip.
+    if lut is None:
+        ycrcb[:, :, 0] = cv2.equalizeHist(ycrcb[:, :, 0])
+    else:
+        ycrcb[:, :, 0] = cv2.LUT(ycrcb[:, :, 0], lut)
+    return cv2.cvtColor(ycrcb, cv2.COLOR_YCrCb2BGR)
+
+# --- FRAME CONTEXT CLASS --- #
+class FrameContext:
+    """
+    Per-frame cache of the preprocessed planes shared by every detector.
+
+    Each plane is computed the first time a detector asks for it and reused
+    for the rest of the frame, so lighting correction and colour
+    classification run at most once per captured frame. The label image
+    holds one class id per pixel (see color_classifier) and replaces a
+    separate HSV conversion and threshold per detector.
+
+    The lighting equalization table is built once per frame, from the coarse
+    frame when `coarse` is set, and applied only to the pixels a detector
+    looks at: the coarse frame and the refined regions. The full-size
+    corrected frame is only made when a detector needs all of it.
+    """
+
+    def __init__(self, frame, classifier=None, coarse=True):
+        self.raw = frame      # Frame as captured (drawn on for the live feed).
+        self.classifier = classifier or DEFAULT_CLASSIFIER
+        self._small = None    # Frame downscaled by coarse_factor (uncorrected).
+        self._bgr = None      # Lighting-corrected BGR frame.
+        self._labels = None   # Class label image of the corrected frame.
+        self._labels_coarse = None
+        self.lut = lighting_lut(self.small if coarse else frame)
+
+    @property
+    def shape(self):
+        return self.raw.shape
+
+    @property
+    def small(self):
+        """Frame downscaled by coarse_factor, before lighting correction."""
+        if self._small is None:
+            factor = self.coarse_factor
+            if factor == 1:
+                self._small = self.raw
+            else:
+                h, w = self.raw.shape[:2]
+                self._small = cv2.resize(self.raw, (w // factor, h // factor), interpolation=cv2.INTER_LINEAR)
+        return self._small
+
+    @property
+    def bgr(self):
+        """Lighting-corrected BGR frame."""
+        if self._bgr is None:
+            self._bgr = adjust_lighting(self.raw, self.lut)
+        return self._bgr
+
+    @property
+    def labels(self):
+        """Class label image of the lighting-corrected frame."""
+        if self._labels is None:
+            self._labels = self.classifier.classify(self.bgr)
+        return self._labels
+
+    @property
+    def coarse_factor(self):
+        """Integer downscale factor from the frame to the coarse frame (1 = no downscale)."""
+        return max(1, self.raw.shape[1] // COARSE_WIDTH)
+
+    @property
+    def labels_coarse(self):
+        """Class label image of the lighting-corrected frame, downscaled by coarse_factor."""
+        if self._labels_coarse is None:
+            if self.coarse_factor == 1:
+                self._labels_coarse = self.labels
+            else:
+                self._labels_coarse = self.classifier.classify(adjust_lighting(self.small, self.lut))
+        return self._labels_coarse
+
+    def labels_region(self, roi):
+        """
+        Class labels for the (x0, y0, x1, y1) region only.
+
+        Slices the full label image when another detector already paid for
+        it, otherwise corrects and classifies just the region.
+        """
+        x0, y0, x1, y1 = roi
+        if self._labels is not None:
+            return self._labels[y0:y1, x0:x1]
+        if self._bgr is not None:
+            return self.classifier.classify(self._bgr[y0:y1, x0:x1])
+        return self.classifier.classify(adjust_lighting(self.raw[y0:y1, x0:x1], self.lut))
@@ -0,0 +1,153 @@
+"""
+Latest-frame grabber for live sources.
+
+cv2.VideoCapture queues decoded frames, so a reader that falls behind a
+network stream drifts seconds behind live. FrameGrabber reads the source on
+its own thread as fast as it delivers and keeps only the newest frame, so a
+slow consumer skips frames instead of lagging, and it reopens the source
+with exponential backoff when a read fails (e.g. Wi-Fi drops).
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from sources import frame_timestamp, is_live, open_source
+
+# --- CONFIGURATION --- #
+BACKOFF_INITIAL_SECONDS = 0.5    # First wait before reopening a failed source.
+BACKOFF_MAX_SECONDS = 10.0       # Longest wait between reopen attempts.
+
+# --- FRAME GRABBER CLASS --- #
+class FrameGrabber:
+    """
+    VideoCapture-like reader that always returns the newest frame.
+
+    `read()` waits for a frame newer than the last one returned and gives
+    (True, frame), or (False, None) once the source has ended (or on
+    timeout). `timestamp()` is the capture time of that frame and `lag` how
+    long it had waited since it was grabbed when read() returned it. Live sources (camera indices, stream
+    URLs) are reopened after a failure; others end at their first failed read.
+    """
+
+    def __init__(self, source, start_at=None, reconnect=None,
+                 backoff_initial=BACKOFF_INITIAL_SECONDS, backoff_max=BACKOFF_MAX_SECONDS):
+        self.source = source
+        self.start_at = start_at
+        self.reconnect = is_live(source) if reconnect is None else reconnect
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.connected = False
+        self.reconnects = 0          # Times the source was reopened after a failure.
+        self.grabbed = 0             # Frames read from the source.
+        self.skipped = 0             # Frames replaced by a newer one before anyone read them.
+        self.lag = 0.0               # Age of the last frame returned by read(), in seconds.
+        self._frame = None
+        self._timestamp = None
+        self._seq = 0                # Seq of the newest grabbed frame.
+        self._taken = 0              # Seq of the last frame returned by read().
+        self._taken_timestamp = None
+        self._grabbed_at = None      # Wall-clock time the newest frame was read.
+        self._ended = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+
+        # The first open is synchronous, so a wrong source fails at once.
+        self._cap = self._open()
+        if not self._cap.isOpened():
+            self._cap.release()
+            self._cap = None
+            if not self.reconnect:
+                self._ended = True
+                return
+            print(f"Could not open {source!r}; retrying in the background.")
+        else:
+            self.connected = True
+        self._thread = threading.Thread(target=self._run, name="grabber", daemon=True)
+        self._thread.start()
+
+    def _open(self):
+        cap = open_source(self.source, self.start_at)
+        if cap.isOpened() and isinstance(cap, cv2.VideoCapture):
+            # Backends that honour it keep no more than one decoded frame queued.
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _run(self):
+        backoff = self.backoff_initial
+        while not self._stop_event.is_set():
+            if self._cap is None:
+                if self._stop_event.wait(backoff):
+                    break
+                backoff = min(backoff * 2, self.backoff_max)
+                cap = self._open()
+                if not cap.isOpened():
+                    cap.release()
+                    continue
+                self._cap = cap
+                self.connected = True
+                self.reconnects += 1
+                print(f"Reconnected to {self.source!r}.")
+
+            ret, frame = self._cap.read()
+            if not ret:
+                self._cap.release()
+                self._cap = None
+                self.connected = False
+                if not self.reconnect:
+                    break
+                print(f"Lost {self.source!r}; reconnecting (backoff {backoff:.1f}s).")
+                continue
+            backoff = self.backoff_initial
+            timestamp = frame_timestamp(self._cap)
+            with self._cond:
+                if self._seq > self._taken:
+                    self.skipped += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self._grabbed_at = time.time()
+                self._seq += 1
+                self.grabbed += 1
+                self._cond.notify_all()
+
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
+
+    # --- VIDEOCAPTURE INTERFACE --- #
+    def isOpened(self):
+        return not self._ended or self._seq > self._taken
+
+    @property
+    def ended(self):
+        """True once the source is closed and its last frame was read."""
+        return self._ended and self._seq <= self._taken
+
+    def read(self, image=None, timeout=None):
+        """Newest frame not yet returned, copied into image if given; (False, None) at the end or on timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._taken or self._ended, timeout)
+            if self._seq <= self._taken:
+                return False, None
+            self._taken = self._seq
+            self._taken_timestamp = self._timestamp
+            frame = self._frame
+            self.lag = time.time() - self._grabbed_at
+        if image is not None:
+            np.copyto(image, frame)
+            frame = image
+        return True, frame
+
+    def timestamp(self):
+        """Capture time of the frame last returned by read()."""
+        return self._taken_timestamp
+
+    def release(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
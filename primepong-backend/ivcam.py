@@ -1,48 +1,10 @@
-import cv2
-import numpy as np
+import sys
+
+import opencv
 
 # Set your iVCam URL (check the app for the correct address)
 stream_url = "http://100.66.66.65:139/video"
 
-# Open video stream
-cap = cv2.VideoCapture(stream_url)
-
-if not cap.isOpened():
-    print("Error: Could not open video stream. Check the IP and port.")
-    exit()
-
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("Failed to grab frame")
-        break
-
-    # Convert to grayscale
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
-    # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    
-    # Edge detection (Canny)
-    edges = cv2.Canny(blurred, 50, 150)
-
-    # Find contours
-    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-    for contour in contours:
-        # Approximate contour to reduce complexity
-        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
-        
-        # Assuming the table is a quadrilateral (4 corners)
-        if len(approx) == 4:
-            cv2.drawContours(frame, [approx], -1, (0, 255, 0), 3)  # Draw green contour
-
-    # Show results
-    cv2.imshow("Table Detection", frame)
-    
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        break
-
-# Release resources
-cap.release()
-cv2.destroyAllWindows()
+# Track the iVCam stream with the standalone tracker (same pipeline as the server).
+if __name__ == "__main__":
+    opencv.main([stream_url] + sys.argv[1:])
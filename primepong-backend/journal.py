@@ -0,0 +1,150 @@
+"""
+Durable append-only journal of match events.
+
+Events are stored one JSON object per line. Appends only queue the event
+in memory; a writer thread writes everything queued since its last pass
+and fsyncs once for the whole batch (group commit), so callers such as
+the detection thread never wait on the disk. An in-memory index of event
+id, timestamp and file offset serves paged reads by id or time.
+"""
+import bisect
+import json
+import os
+import threading
+from array import array
+
+# --- CONFIGURATION --- #
+GROUP_COMMIT_SECONDS = 0.05   # Minimum time between two fsyncs; appends in between share one.
+MAX_PAGE_SIZE = 1000          # Largest page returned by read().
+
+# --- JOURNAL CLASS --- #
+class Journal:
+    """
+    Append-only event log with group-commit fsync and an id/time index.
+
+    Every event must carry a unique, increasing "id" and a "timestamp".
+    `last_id` is the id of the last appended event and `durable_id` the id of
+    the last event known to be on disk; read() only returns durable events.
+    """
+
+    def __init__(self, path, group_commit_seconds=GROUP_COMMIT_SECONDS, fsync=True):
+        self.path = path
+        self.group_commit_seconds = group_commit_seconds
+        self.fsync = fsync
+        self._ids = array("q")        # Event id of every durable entry, in file order.
+        self._times = array("d")      # Timestamp of every durable entry.
+        self._offsets = array("q")    # Byte offset of every durable entry.
+        self._size = self._load_index()
+        self.last_id = self.durable_id = self._ids[-1] if self._ids else 0
+
+        self._file = open(path, "ab")
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="journal", daemon=True)
+        self._writer.start()
+
+    def _load_index(self):
+        """Indexes the existing file; drops a torn last line left by a crash. Returns the file size."""
+        if not os.path.exists(self.path):
+            return 0
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    break
+                self._ids.append(event["id"])
+                self._times.append(event["timestamp"])
+                self._offsets.append(offset)
+                offset += len(line)
+        if offset != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        return offset
+
+    # --- WRITING --- #
+    def append(self, event):
+        """Queues an event for the writer thread; never blocks on disk."""
+        line = (json.dumps(event, separators=(",", ":")) + "\n").encode()
+        with self._cond:
+            if event["id"] <= self.last_id:
+                raise ValueError(f"journal ids must increase ({event['id']} after {self.last_id})")
+            self.last_id = event["id"]
+            self._pending.append((event["id"], event["timestamp"], line))
+            self._cond.notify_all()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending and self._closed:
+                    return
+                batch, self._pending = self._pending, []
+            self._file.write(b"".join(line for _, _, line in batch))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            with self._cond:
+                for event_id, timestamp, line in batch:
+                    self._ids.append(event_id)
+                    self._times.append(timestamp)
+                    self._offsets.append(self._size)
+                    self._size += len(line)
+                self.durable_id = batch[-1][0]
+                self._cond.notify_all()
+                # Let appends pile up so the next fsync covers a whole group.
+                self._cond.wait_for(lambda: self._closed, self.group_commit_seconds)
+
+    def flush(self, timeout=None):
+        """Waits until every appended event is on disk; returns False on timeout."""
+        with self._cond:
+            target = self.last_id
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self.durable_id >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        self._file.close()
+
+    # --- READING --- #
+    def index_after(self, since_id):
+        """Position in the index of the first durable event with an id greater than since_id."""
+        return bisect.bisect_right(self._ids, since_id)
+
+    def id_at_time(self, timestamp):
+        """Id of the last durable event before timestamp (0 if none), for since= paging by time."""
+        with self._cond:
+            position = bisect.bisect_left(self._times, timestamp)
+            return self._ids[position - 1] if position else 0
+
+    def read(self, since_id=0, limit=100):
+        """Returns (events, more): up to limit durable events with an id greater than since_id."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._cond:
+            start = self.index_after(since_id)
+            end = min(start + limit, len(self._ids))
+            more = end < len(self._ids)
+            if start >= end:
+                return [], False
+            begin = self._offsets[start]
+            stop = self._offsets[end] if end < len(self._offsets) else self._size
+        with open(self.path, "rb") as f:
+            f.seek(begin)
+            data = f.read(stop - begin)
+        return [json.loads(line) for line in data.splitlines()], more
+
+    def replay(self, since_id=0):
+        """Yields every durable event after since_id, in order."""
+        while True:
+            events, more = self.read(since_id, MAX_PAGE_SIZE)
+            yield from events
+            if not more:
+                return
+            since_id = events[-1]["id"]
@@ -0,0 +1,73 @@
+"""
+Motion gate: a cheap per-frame check of whether anything in view moved, so
+full detection and re-encoding can idle while the table is still (between
+points, during serve setup).
+"""
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+GATE_WIDTH = 160            # Frames are compared as blurred grayscale thumbnails this wide.
+MIN_PIXEL_DIFF = 8          # Smallest grey-level change ever counted as motion.
+NOISE_FACTOR = 4.0          # A pixel moved when it changed by this many times the noise level.
+NOISE_ALPHA = 0.05          # Smoothing of the noise level, learned from still frames.
+MIN_MOVING_PIXELS = 3       # Moved thumbnail pixels that make a frame count as motion.
+IDLE_AFTER_SECONDS = 0.5    # Stillness before the gate goes idle.
+IDLE_FPS = 2                # Frames admitted per second while idle.
+
+# --- MOTION GATE CLASS --- #
+class MotionGate:
+    """
+    Frame-differencing motion gate with an adaptive threshold.
+
+    `admit(frame, timestamp)` compares a thumbnail of the frame with the
+    previous one. A pixel moved when it changed by more than NOISE_FACTOR
+    times the noise level, the running mean difference of still frames, so
+    sensor noise and flicker raise the threshold instead of waking the gate.
+    After `idle_after` seconds without motion the gate is idle and admits
+    only `idle_fps` frames a second, keeping the table and score state fresh;
+    the first frame with motion is admitted and ends the idle spell.
+    """
+
+    def __init__(self, width=GATE_WIDTH, idle_after=IDLE_AFTER_SECONDS, idle_fps=IDLE_FPS):
+        self.width = width
+        self.idle_after = idle_after
+        self.idle_interval = 1.0 / idle_fps
+        self.noise = MIN_PIXEL_DIFF / NOISE_FACTOR
+        self.idle = False
+        self.moving_pixels = 0       # Moved pixels in the last frame.
+        self._last_motion = None
+        self._next_idle_frame = 0.0
+        self._previous = None
+
+    def _thumbnail(self, frame):
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (3, 3), 0)
+
+    def admit(self, frame, timestamp):
+        """True if the frame should get full detection: it has motion, or is an idle-rate sample."""
+        thumb = self._thumbnail(frame)
+        previous, self._previous = self._previous, thumb
+        if previous is None or previous.shape != thumb.shape:
+            self._last_motion = timestamp
+            return True
+        diff = cv2.absdiff(thumb, previous)
+        threshold = max(MIN_PIXEL_DIFF, NOISE_FACTOR * self.noise)
+        self.moving_pixels = int(np.count_nonzero(diff > threshold))
+        if self.moving_pixels >= MIN_MOVING_PIXELS:
+            self._last_motion = timestamp
+            self.idle = False
+            return True
+
+        # A still frame: learn the noise level from it.
+        self.noise += NOISE_ALPHA * (float(diff.mean()) - self.noise)
+        if not self.idle:
+            if timestamp - self._last_motion < self.idle_after:
+                return True
+            self.idle = True
+            self._next_idle_frame = timestamp
+        if timestamp < self._next_idle_frame:
+            return False
+        self._next_idle_frame = timestamp + self.idle_interval
+        return True
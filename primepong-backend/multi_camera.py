@@ -0,0 +1,348 @@
+"""
+Multi-camera capture: one detection process per camera, fused ball state.
+
+Each camera source runs in its own process (so two 60 fps feeds are not
+serialized by the GIL), captures straight into a shared-memory ring of
+frames, and runs the table/ball detectors on the frame in place. Per-frame
+observations (ball position in table centimetres, side, zone) are sent to
+the parent, which merges them in timestamp order into one fused ball state
+that drives scoring.
+
+Sources are anything sources.open_source accepts: camera indices, stream
+URLs, video files, or synthetic scenes ("synthetic",
+"synthetic?size=640x360&perspective=0.3&occlude=left&seed=1"), so the
+whole path can be run on one machine:
+
+    python multi_camera.py synthetic "synthetic?occlude=left&perspective=0.3" --duration 40
+"""
+import argparse
+import heapq
+import multiprocessing
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from scoring import ScoreKeeper
+from sources import frame_timestamp, is_live, open_source
+
+# --- CONFIGURATION --- #
+RING_SLOTS = 4                # Frames kept per camera in shared memory.
+REORDER_SECONDS = 0.05        # How long observations wait for slower cameras before fusion.
+FUSION_WINDOW_SECONDS = 0.05  # A camera's sighting counts for the fused state for this long.
+ZONE_RANK = {"table": 3, "green_margin": 2, "purple_margin": 1, "out": 0}
+
+# --- SHARED FRAME RING --- #
+class SharedFrameRing:
+    """
+    Single-writer ring of frames in shared memory.
+
+    Layout: a (slots, 2) float64 table of (seq, timestamp) per slot, the
+    newest seq, then `slots` frames. The writer invalidates a slot before
+    overwriting it; readers copy a slot and re-check its seq, so a reader
+    that fell a whole ring behind retries instead of returning a torn frame.
+    """
+
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        header_bytes = slots * 16 + 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * frame_bytes)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        buf = self.shm.buf
+        self.meta = np.ndarray((slots, 2), dtype="float64", buffer=buf)
+        self.head = np.ndarray((1,), dtype="int64", buffer=buf, offset=slots * 16)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=buf, offset=header_bytes)
+        if self.owner:
+            self.meta[:, 0] = -1
+            self.head[0] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def begin_write(self, seq):
+        """Returns the slot view to write frame seq into (invalidated until commit)."""
+        slot = seq % self.slots
+        self.meta[slot, 0] = -1
+        return self.frames[slot]
+
+    def commit(self, seq, timestamp):
+        slot = seq % self.slots
+        self.meta[slot, 1] = timestamp
+        self.meta[slot, 0] = seq
+        self.head[0] = seq
+
+    def latest(self):
+        """Copy of the newest frame as (seq, timestamp, frame), or (-1, None, None)."""
+        while True:
+            seq = int(self.head[0])
+            if seq < 0:
+                return -1, None, None
+            slot = seq % self.slots
+            timestamp = float(self.meta[slot, 1])
+            frame = self.frames[slot].copy()
+            if int(self.meta[slot, 0]) == seq:
+                return seq, timestamp, frame
+
+    def close(self):
+        # Drop the array views first; the mapping cannot close while they exist.
+        self.meta = self.head = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+# --- CAMERA WORKER PROCESS --- #
+def camera_worker(camera_id, source, start_at, observations, stop_event, ball_tracking=True, table_lock=True):
+    """
+    Capture and detection loop of one camera, run in its own process.
+
+    Sends ("ready", camera_id, ring_name, shape) once the frame size is known,
+    then ("obs", observation) for every frame and ("done", camera_id) at the end.
+    """
+    from detection import DetectionCore
+    from grabber import FrameGrabber
+
+    # Live sources are drained on a grabber thread so detection always gets the newest frame.
+    cap = FrameGrabber(source, start_at) if is_live(source) else open_source(source, start_at)
+    if not cap.isOpened():
+        observations.put(("done", camera_id, f"could not open {source!r}"))
+        return
+    core = DetectionCore(ball_tracking=ball_tracking, table_lock=table_lock)
+
+    ret, first = cap.read()
+    if not ret:
+        observations.put(("done", camera_id, f"no frames from {source!r}"))
+        return
+    ring = SharedFrameRing(first.shape)
+    observations.put(("ready", camera_id, ring.name, first.shape))
+    seq = 0
+    frame = ring.begin_write(seq)
+    frame[...] = first
+    try:
+        while not stop_event.is_set():
+            timestamp = frame_timestamp(cap)
+            ring.commit(seq, timestamp)
+
+            # Detect on the shared frame in place; the lighting-corrected frame
+            # and label image are private to this process.
+            results = core.process(frame)
+            observations.put(("obs", {
+                "camera": camera_id, "seq": seq, "timestamp": timestamp,
+                "table_vertices": results["table_vertices"],
+                "geometry_version": core.detector.geometry_version,
+                "ball": results["ball_center"], "ball_radius": results["ball_radius"],
+                "side": results.get("side"), "zone": results.get("zone"), "ball_cm": results.get("ball_cm"),
+            }))
+
+            seq += 1
+            frame = ring.begin_write(seq)
+            ret, _ = cap.read(frame)
+            if not ret:
+                break
+    finally:
+        cap.release()
+        observations.put(("done", camera_id, None))
+        # Give the parent time to drop its mapping before the segment is unlinked.
+        stop_event.wait(1.0)
+        ring.close()
+
+# --- FUSION --- #
+class BallFusion:
+    """
+    Merges per-camera observations into one ball state, in timestamp order.
+
+    Observations are held for REORDER_SECONDS so every camera's frame for a
+    given moment is in before it is fused. The fused ball is visible while
+    any camera saw it within FUSION_WINDOW_SECONDS; its table position is the
+    mean over those cameras (all share table centimetres), and its side comes
+    from the camera that places it deepest inside the table area.
+    """
+
+    def __init__(self, reorder_seconds=REORDER_SECONDS, window_seconds=FUSION_WINDOW_SECONDS):
+        self.reorder_seconds = reorder_seconds
+        self.window_seconds = window_seconds
+        self.latest = {}          # Last fused observation per camera.
+        self.clock = 0.0          # Timestamp of the last fused state.
+        self.late = 0             # Observations that arrived after their moment was fused.
+        self._pending = []
+
+    def add(self, observation):
+        heapq.heappush(self._pending, (observation["timestamp"], observation["camera"],
+                                       observation["seq"], observation))
+
+    def drain(self, now=None):
+        """Fuses every observation older than the reorder delay (all if now is None)."""
+        fused = []
+        while self._pending and (now is None or self._pending[0][0] <= now - self.reorder_seconds):
+            timestamp, camera, _, observation = heapq.heappop(self._pending)
+            if timestamp < self.clock:
+                self.late += 1
+            previous = self.latest.get(camera)
+            if previous is None or previous["timestamp"] <= timestamp:
+                self.latest[camera] = observation
+            self.clock = max(self.clock, timestamp)
+            fused.append(self.state(self.clock))
+        return fused
+
+    def state(self, timestamp):
+        """Fused ball state at timestamp from each camera's latest observation."""
+        seen = [obs for obs in self.latest.values()
+                if obs["ball"] is not None and timestamp - obs["timestamp"] <= self.window_seconds]
+        state = {"timestamp": timestamp, "cameras": sorted(obs["camera"] for obs in seen),
+                 "ball_cm": None, "side": None, "zone": None}
+        if not seen:
+            return state
+        located = [obs["ball_cm"] for obs in seen if obs["ball_cm"] is not None]
+        if located:
+            state["ball_cm"] = tuple(float(v) for v in np.mean(located, axis=0))
+        best = max(seen, key=lambda obs: (ZONE_RANK.get(obs["zone"], -1), obs["timestamp"]))
+        state["side"] = best["side"]
+        state["zone"] = best["zone"]
+        return state
+
+# --- MULTI-CAMERA TRACKER --- #
+class MultiCameraTracker:
+    """
+    Runs one camera_worker process per source and scores on the fused ball.
+
+    on_score(winner) is called from the fusion thread when a point is scored.
+    latest_frame(camera) and latest_observation(camera) give the newest frame
+    and detection of any camera, e.g. for the live feed.
+    """
+
+    def __init__(self, sources, delay_seconds=3, on_score=None, ball_tracking=True, table_lock=True):
+        self.sources = list(sources)
+        self.on_score = on_score
+        self.score_keeper = ScoreKeeper(delay_seconds)
+        self.fusion = BallFusion()
+        self.fused = None                       # Last fused ball state.
+        self.frames_processed = [0] * len(self.sources)
+        self._ball_tracking = ball_tracking
+        self._table_lock = table_lock
+        self._ctx = multiprocessing.get_context("spawn")
+        self._observations = self._ctx.Queue()
+        self._stop_event = self._ctx.Event()
+        self._processes = []
+        self._rings = {}
+        self._latest = {}
+        self._done = set()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self, start_at=None):
+        """Starts the camera processes; synthetic sources begin playing at start_at."""
+        start_at = time.time() + 2.0 if start_at is None else start_at
+        for camera_id, source in enumerate(self.sources):
+            process = self._ctx.Process(
+                target=camera_worker, name=f"camera-{camera_id}", daemon=True,
+                args=(camera_id, source, start_at, self._observations, self._stop_event,
+                      self._ball_tracking, self._table_lock))
+            process.start()
+            self._processes.append(process)
+        self._thread = threading.Thread(target=self._fusion_loop, name="fusion", daemon=True)
+        self._thread.start()
+
+    def _fusion_loop(self):
+        while len(self._done) < len(self.sources):
+            try:
+                message = self._observations.get(timeout=0.05)
+            except queue.Empty:
+                message = None
+            if message is not None:
+                self._handle(message)
+            self._score(self.fusion.drain(time.time()))
+        self._score(self.fusion.drain())
+        self._close_rings()
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == "obs":
+            observation = message[1]
+            self.frames_processed[observation["camera"]] += 1
+            self._latest[observation["camera"]] = observation
+            self.fusion.add(observation)
+        elif kind == "ready":
+            _, camera_id, ring_name, shape = message
+            with self._cond:
+                self._rings[camera_id] = SharedFrameRing(shape, name=ring_name)
+                self._cond.notify_all()
+        elif kind == "done":
+            _, camera_id, error = message
+            if error:
+                print(f"Camera {camera_id}: {error}")
+            self._done.add(camera_id)
+
+    def _score(self, states):
+        for state in states:
+            self.fused = state
+            # The score keeper only needs to know whether any camera sees the ball.
+            seen = True if state["cameras"] else None
+            winner = self.score_keeper.update(seen, state["side"], state["timestamp"])
+            if winner is not None and self.on_score is not None:
+                self.on_score(winner)
+
+    def _close_rings(self):
+        with self._cond:
+            for ring in self._rings.values():
+                ring.close()
+            self._rings.clear()
+
+    def latest_frame(self, camera_id=0, timeout=None):
+        """Copy of the newest frame of a camera as (seq, timestamp, frame); waits for the camera to start."""
+        with self._cond:
+            if camera_id not in self._rings:
+                self._cond.wait_for(lambda: camera_id in self._rings, timeout)
+            ring = self._rings.get(camera_id)
+            if ring is None:
+                return -1, None, None
+            return ring.latest()
+
+    def latest_observation(self, camera_id=0):
+        return self._latest.get(camera_id)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+# --- COMMAND LINE --- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run fused multi-camera tracking and print score events.")
+    parser.add_argument("sources", nargs="+", help="Camera indices, stream URLs, video files or synthetic specs.")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds.")
+    parser.add_argument("--delay", type=float, default=3.0, help="Seconds undetected before a point is scored.")
+    args = parser.parse_args(argv)
+
+    start = time.time()
+    tracker = MultiCameraTracker(
+        args.sources, delay_seconds=args.delay,
+        on_score=lambda winner: print(f"[{time.time() - start:6.1f}s] Score event! Player {winner} scores."))
+    tracker.start()
+    try:
+        while tracker.running and (args.duration is None or time.time() - start < args.duration):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    tracker.stop()
+    elapsed = time.time() - start
+    for camera_id, source in enumerate(tracker.sources):
+        print(f"camera {camera_id} ({source}): {tracker.frames_processed[camera_id]} frames, "
+              f"{tracker.frames_processed[camera_id] / elapsed:.1f} fps")
+    print(f"late observations: {tracker.fusion.late}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Offline match analysis: rescores recorded matches with the server's
+detection and event rules, many times faster than real time.
+
+Every video is split into chunks (at keyframes, when ffprobe is installed)
+and the chunks of all videos are analysed in parallel on a process pool.
+Each chunk starts decoding a preroll (the scoring delay plus
+PREROLL_MARGIN_SECONDS) before its own first frame, so its table lock, ball
+track, trajectory and point timer are warm, as if the video had been played
+from the start, when its own frames begin; only the events inside the chunk
+are kept. The chunk timelines are then stitched in order into one event log
+per video: ids renumbered, repeated ball and side states dropped, and scores
+running on across chunks. Logs use the journal format, with timestamps in
+seconds into the video, so MatchState and /events/history can replay them
+like a live match.
+
+    python offline.py match.mp4                       # Writes match.events.jsonl
+    python offline.py day1/*.mp4 --out audit/ --workers 16
+    python primepong.py analyze match.mp4
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+
+import cv2
+
+from detection import DetectionCore
+from detection_pool import default_workers
+from journal import Journal
+from scoring import CONFIDENCE_THRESHOLD, MatchState, OutOfPlayJudge
+from segmentation import resolution_scale
+from sources import VideoFileCapture
+from trajectory import Trajectory
+
+# --- CONFIGURATION --- #
+DELAY_SECONDS = 3          # Delay before scoring after ball is undetectable
+CHUNK_SECONDS = 60         # Video analysed by one task; short chunks balance the pool better.
+PREROLL_MARGIN_SECONDS = 2  # A chunk's preroll lasts the scoring delay plus this.
+BALL_TRACKING = True
+TABLE_LOCK = True
+COARSE_TO_FINE = True
+
+# --- CHUNK PLANNING --- #
+def keyframe_times(path):
+    """Timestamps of the video's keyframes, via ffprobe; None when ffprobe is not installed or fails."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    try:
+        output = subprocess.run(
+            [ffprobe, "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+             "-show_entries", "frame=pts_time", "-of", "csv=p=0", path],
+            capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    times = sorted(float(line) for line in output.split() if line.replace(".", "", 1).isdigit())
+    return times or None
+
+def plan_chunks(path, chunk_seconds=CHUNK_SECONDS, preroll_seconds=DELAY_SECONDS + PREROLL_MARGIN_SECONDS):
+    """
+    Splits a video into (seek, start, end) chunks, in seconds: frames from
+    start to end belong to the chunk, and decoding starts at seek. With
+    keyframes known, chunk starts move to the next keyframe and seeks to the
+    keyframe before the preroll, so no chunk decodes frames it throws away
+    just to reach its seek point. Returns the chunks and the video's duration.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video {path!r}.")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / fps if fps > 0 else 0.0
+    cap.release()
+
+    keyframes = keyframe_times(path)
+    starts = [0.0]
+    nominal = chunk_seconds
+    while nominal < duration - chunk_seconds / 2:
+        if keyframes is not None:
+            nominal = next((t for t in keyframes if t >= nominal), duration)
+        if nominal >= duration:
+            break
+        starts.append(nominal)
+        nominal += chunk_seconds
+
+    chunks = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else float("inf")
+        seek = max(start - preroll_seconds, 0.0)
+        if keyframes is not None and start > 0:
+            seek = max((t for t in keyframes if t <= seek), default=0.0)
+        chunks.append((seek, start, end))
+    return chunks, duration
+
+# --- CHUNK ANALYSIS --- #
+class ChunkAnalyzer:
+    """
+    The server's per-frame match rules on recorded frames: ball and side
+    transitions, trajectory bounces and rallies, and points called by the
+    out-of-play judge, with frame timestamps as the clock. Events are only
+    recorded while `recording`.
+    """
+
+    def __init__(self, delay_seconds=DELAY_SECONDS, confidence=CONFIDENCE_THRESHOLD, ball_tracking=BALL_TRACKING,
+                 table_lock=TABLE_LOCK, coarse=COARSE_TO_FINE):
+        self.core = DetectionCore(ball_tracking, table_lock, coarse)
+        self.judge = OutOfPlayJudge(delay_seconds, confidence)
+        self.trajectory = Trajectory()
+        self.recording = False
+        self.events = []
+        self.frames = 0
+        self.timestamp = None      # Timestamp of the frame being processed
+        self._ball_visible = False
+        self._ball_side = None
+
+    def publish(self, event_type, **data):
+        """Records an event at the current frame's timestamp."""
+        if self.recording:
+            event = {"type": event_type, "timestamp": self.timestamp}
+            event.update(data)
+            self.events.append(event)
+
+    def process(self, frame, timestamp):
+        self.timestamp = timestamp
+        results = self.core.process(frame)
+        self.frames += 1
+        ball_center, side, ball_cm = results["ball_center"], results.get("side"), results.get("ball_cm")
+
+        visible = ball_center is not None
+        if visible != self._ball_visible:
+            self._ball_visible = visible
+            self.publish("ball", visible=visible, side=side, ball_cm=ball_cm)
+        if side is not None and side != self._ball_side:
+            self._ball_side = side
+            self.publish("side", side=side, ball_cm=ball_cm)
+
+        kind = self.trajectory.update(timestamp, ball_center, resolution_scale(frame.shape),
+                                      ball_cm, results.get("zone"), side)
+        if kind == "bounce":
+            bounce = dict(self.trajectory.last_bounce)
+            bounce["sample_time"] = bounce.pop("timestamp")   # Same fields as the server's bounce events.
+            self.publish("bounce", **bounce)
+        elif kind == "rally":
+            self.publish("rally", **self.trajectory.last_rally)
+
+        winner = self.judge.update(timestamp, results, self.trajectory, kind, frame.shape)
+        if winner is not None:
+            call = self.judge.last_call
+            self.publish("score", winner=winner, reason=call["reason"], confidence=call["confidence"])
+
+def analyze_chunk(task):
+    """Pool task: analyses one chunk; returns (path, chunk index, events, frames decoded)."""
+    path, index, (seek, start, end), options = task
+    analyzer = ChunkAnalyzer(**options)
+    cap = VideoFileCapture(path, 0.0)
+    if seek > 0:
+        cap.cap.set(cv2.CAP_PROP_POS_MSEC, seek * 1000.0)
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.timestamp()
+            if timestamp >= end:
+                break
+            analyzer.recording = timestamp >= start
+            analyzer.process(frame, timestamp)
+    finally:
+        cap.release()
+    return path, index, analyzer.events, analyzer.frames
+
+# --- STITCHING --- #
+def stitch(chunk_events):
+    """
+    Joins the event lists of consecutive chunks into one log: drops ball and
+    side events that repeat the state already logged (a chunk's preroll can
+    see a transition the previous chunk logged too), and numbers the events
+    from 1. Returns the events and the final MatchState.
+    """
+    events = []
+    match = MatchState()
+    visible, side = False, None
+    for chunk in chunk_events:
+        for event in chunk:
+            kind = event["type"]
+            if kind == "ball":
+                if event["visible"] == visible:
+                    continue
+                visible = event["visible"]
+            elif kind == "side":
+                if event["side"] == side:
+                    continue
+                side = event["side"]
+            event = dict(event, id=len(events) + 1)
+            events.append(event)
+            match.apply(event)
+    return events, match
+
+def write_log(path, events):
+    """Writes the events to path in the journal format, replacing any earlier log."""
+    if os.path.exists(path):
+        os.remove(path)
+    journal = Journal(path, fsync=False)
+    for event in events:
+        journal.append(event)
+    journal.close()
+
+def log_path(video, out_dir=None):
+    stem = os.path.splitext(os.path.basename(video))[0]
+    return os.path.join(out_dir or os.path.dirname(os.path.abspath(video)), f"{stem}.events.jsonl")
+
+def analyze(videos, out_dir=None, workers=None, chunk_seconds=CHUNK_SECONDS, **options):
+    """
+    Analyses every video on a pool of `workers` processes (default_workers()
+    by default) and writes each video's event log. Options go to ChunkAnalyzer.
+    Returns {video: (log path, MatchState, duration in seconds)}.
+    """
+    preroll = options.get("delay_seconds", DELAY_SECONDS) + PREROLL_MARGIN_SECONDS
+    tasks = []
+    durations = {}
+    for video in videos:
+        chunks, durations[video] = plan_chunks(video, chunk_seconds, preroll)
+        for index, chunk in enumerate(chunks):
+            tasks.append((video, index, chunk, options))
+    workers = workers or default_workers()
+    chunk_events = {video: {} for video in videos}
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(min(workers, len(tasks))) as pool:
+        for video, index, events, _ in pool.imap_unordered(analyze_chunk, tasks):
+            chunk_events[video][index] = events
+
+    analysed = {}
+    for video in videos:
+        chunks = chunk_events[video]
+        events, match = stitch(chunks[index] for index in sorted(chunks))
+        path = log_path(video, out_dir)
+        write_log(path, events)
+        analysed[video] = (path, match, durations[video])
+    return analysed
+
+# --- MAIN FUNCTION --- #
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore recorded matches into event logs, in parallel.")
+    parser.add_argument("videos", nargs="+", help="Recorded match videos.")
+    parser.add_argument("--out", help="Directory for the event logs (default: next to each video).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per core, less one).")
+    parser.add_argument("--chunk", type=float, default=CHUNK_SECONDS,
+                        help="Seconds of video per task (default: %(default)s).")
+    parser.add_argument("--delay", type=float, default=DELAY_SECONDS,
+                        help="Seconds undetected before a point is scored when the trajectory is unclear.")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE_THRESHOLD,
+                        help="Confidence the trajectory needs to call a point (default: %(default)s).")
+    args = parser.parse_args(argv)
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        analysed = analyze(args.videos, args.out, args.workers, args.chunk,
+                           delay_seconds=args.delay, confidence=args.confidence)
+    except RuntimeError as exc:
+        print(exc)
+        return
+    elapsed = time.perf_counter() - start
+    for video, (path, match, _) in analysed.items():
+        state = match.to_dict()
+        print(f"{video}: A {state['score']['A']} - B {state['score']['B']}, "
+              f"{state['last_event_id']} events -> {path}")
+    footage = sum(duration for _, _, duration in analysed.values())
+    print(f"Analysed {footage:.0f}s of video in {elapsed:.1f}s ({footage / max(elapsed, 1e-9):.1f}x real time).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Paddle simulator for load-testing the sensor hub without hardware.
+
+Each simulated paddle samples force and acceleration at --rate Hz and sends
+the samples in batches every --batch-ms, either over HTTP to a running
+server (/paddles/<id>/samples) or straight into an in-process SensorHub.
+
+    python paddle_simulator.py --url http://localhost:5000 --paddles 2
+    python paddle_simulator.py --in-process --paddles 50 --rate 500 --duration 10
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from broadcast import EventStream
+from sensor_hub import HIT_DEBOUNCE_SECONDS, SensorHub
+
+HIT_PULSE_SECONDS = 0.02   # How long the force sensor reads high for one hit.
+
+# --- SIMULATED PADDLE CLASS --- #
+class SimulatedPaddle:
+    """Generates batches of paddle samples with random hits and swings."""
+
+    def __init__(self, paddle_id, rate, hits_per_second, seed=None):
+        self.paddle_id = paddle_id
+        self.rate = rate
+        self.hits_per_second = hits_per_second
+        self.rng = np.random.default_rng(seed)
+        self.device_time = 0.0
+        self.hits_sent = 0
+        self._pulse_left = 0   # Samples remaining in the current force pulse.
+        self._quiet = 0        # Samples before another hit may start (real hits are never closer).
+
+    def batch(self, n):
+        """Returns a column batch of the next n samples."""
+        t = self.device_time + np.arange(1, n + 1) / self.rate
+        self.device_time = float(t[-1])
+
+        force = np.zeros(n, dtype="float32")
+        pulse_samples = max(int(HIT_PULSE_SECONDS * self.rate), 1)
+        refractory = int(HIT_DEBOUNCE_SECONDS * self.rate) + 1
+        starts = self.rng.random(n) < self.hits_per_second / self.rate
+        for i in range(n):
+            self._quiet = max(self._quiet - 1, 0)
+            if self._quiet == 0 and starts[i]:
+                self._pulse_left = pulse_samples
+                self._quiet = refractory
+                self.hits_sent += 1
+            if self._pulse_left > 0:
+                force[i] = 1.0
+                self._pulse_left -= 1
+
+        accel = self.rng.normal(0.0, 0.02, size=(n, 3))
+        accel[:, 2] += 1.0  # Gravity.
+        swing = force > 0
+        accel[swing] += self.rng.normal(0.0, 0.6, size=(int(swing.sum()), 3))
+        return {
+            "t": t.tolist(),
+            "sent_at": self.device_time,
+            "force": force.tolist(),
+            "ax": accel[:, 0].tolist(),
+            "ay": accel[:, 1].tolist(),
+            "az": accel[:, 2].tolist(),
+        }
+
+# --- RUNNERS --- #
+def _run_paddle(paddle, send, batch_size, interval, duration, stats):
+    deadline = time.time() + duration
+    next_send = time.time()
+    while time.time() < deadline:
+        batch = paddle.batch(batch_size)
+        start = time.perf_counter()
+        send(paddle.paddle_id, batch)
+        stats["latency"].append(time.perf_counter() - start)
+        next_send += interval
+        time.sleep(max(next_send - time.time(), 0))
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate paddles feeding the PrimePong sensor hub.")
+    parser.add_argument("--url", default="http://localhost:5000", help="Server base URL.")
+    parser.add_argument("--in-process", action="store_true", help="Feed an in-process SensorHub instead of HTTP.")
+    parser.add_argument("--paddles", type=int, default=2, help="Number of simulated paddles.")
+    parser.add_argument("--rate", type=float, default=200.0, help="Samples per second per paddle.")
+    parser.add_argument("--batch-ms", type=float, default=50.0, help="Milliseconds of samples per batch.")
+    parser.add_argument("--hits-per-second", type=float, default=1.0, help="Average hits per paddle per second.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run.")
+    args = parser.parse_args()
+
+    interval = args.batch_ms / 1000.0
+    batch_size = max(int(args.rate * interval), 1)
+    paddle_ids = ["A", "B"] if args.paddles == 2 else [f"P{i}" for i in range(args.paddles)]
+
+    if args.in_process:
+        hub = SensorHub(EventStream())
+        send = hub.ingest
+    else:
+        import requests
+
+        session = requests.Session()
+
+        def send(paddle_id, batch):
+            session.post(f"{args.url}/paddles/{paddle_id}/samples", json=batch, timeout=2.0).raise_for_status()
+
+    paddles = [SimulatedPaddle(pid, args.rate, args.hits_per_second, seed=i) for i, pid in enumerate(paddle_ids)]
+    stats = {"latency": []}
+    threads = [threading.Thread(target=_run_paddle,
+                                args=(paddle, send, batch_size, interval, args.duration, stats))
+               for paddle in paddles]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    latency_ms = np.array(stats["latency"]) * 1000.0
+    samples = len(latency_ms) * batch_size
+    print(f"{len(paddles)} paddles, {samples} samples in {elapsed:.1f}s "
+          f"({samples / elapsed:.0f} samples/s)")
+    print(f"ingest latency ms: p50={np.percentile(latency_ms, 50):.2f} "
+          f"p99={np.percentile(latency_ms, 99):.2f} max={latency_ms.max():.2f}")
+    hits_sent = sum(paddle.hits_sent for paddle in paddles)
+    if args.in_process:
+        hits_seen = sum(paddle["hits"] for paddle in hub.state().values())
+        print(f"hits sent={hits_sent} detected={hits_seen}")
+    else:
+        print(f"hits sent={hits_sent}")
+
+if __name__ == "__main__":
+    main()
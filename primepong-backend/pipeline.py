@@ -0,0 +1,145 @@
+import collections
+import itertools
+import threading
+import time
+import traceback
+
+# --- FRAME PACKET --- #
+class FramePacket:
+    """A captured frame travelling through the pipeline, plus the results of each stage."""
+
+    _seq_counter = itertools.count()
+
+    def __init__(self, frame, timestamp=None):
+        self.seq = next(FramePacket._seq_counter)   # Monotonic capture sequence number.
+        self.timestamp = time.time() if timestamp is None else timestamp  # Capture time.
+        self.frame = frame
+        self.results = {}                            # Filled in by the stages.
+
+# --- DROP-OLDEST QUEUE --- #
+class DropOldestQueue:
+    """
+    Bounded FIFO that never blocks the producer.
+
+    When the queue is full, `put` discards the oldest item so consumers
+    always see the freshest data. Dropped items are counted in `dropped`.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the oldest queued item, or None if nothing arrives within timeout."""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+# --- STAGE --- #
+class Stage:
+    """
+    One pipeline step running `func(packet)` on its own worker thread(s).
+
+    The function returns the packet to hand to the next stage, or None to
+    drop it. A packet whose function raises is dropped and counted in
+    `errors`; the worker logs the traceback (once per distinct error) and
+    carries on with the next packet. Stateless stages can use several
+    workers; OpenCV releases the GIL inside encode and drawing calls, so
+    extra workers use spare cores.
+    """
+
+    def __init__(self, name, func, workers=1, maxsize=1):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.input = DropOldestQueue(maxsize)
+        self.output = None          # Input queue of the next stage (None for the sink).
+        self.processed = 0
+        self.errors = 0
+        self._last_error = None
+        self._threads = []
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            packet = self.input.get(timeout=0.1)
+            if packet is None:
+                continue
+            try:
+                result = self.func(packet)
+            except Exception as exc:
+                self.errors += 1
+                if repr(exc) != self._last_error:
+                    self._last_error = repr(exc)
+                    print(f"Stage {self.name} failed on frame {packet.seq}, dropping it:")
+                    traceback.print_exc()
+                continue
+            self.processed += 1
+            if result is not None and self.output is not None:
+                self.output.put(result)
+
+    def start(self, stop_event):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(stop_event,),
+                                      name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+# --- PIPELINE --- #
+class Pipeline:
+    """
+    A frame source feeding a chain of stages linked by drop-oldest queues.
+
+    `source()` is called in a loop on its own thread and returns a
+    (frame, capture time) pair, or None when no frame could be read. Each
+    frame is wrapped in a FramePacket stamped with that time and a sequence
+    number.
+    """
+
+    def __init__(self, source, stages):
+        self.source = source
+        self.stages = stages
+        for stage, next_stage in zip(stages, stages[1:]):
+            stage.output = next_stage.input
+        self._stop_event = threading.Event()
+
+    def _capture_loop(self):
+        head = self.stages[0].input
+        while not self._stop_event.is_set():
+            captured = self.source()
+            if captured is None:
+                continue
+            frame, timestamp = captured
+            head.put(FramePacket(frame, timestamp))
+
+    def start(self):
+        for stage in self.stages:
+            stage.start(self._stop_event)
+        thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def dropped(self):
+        """Frames dropped at the input of each stage, by stage name."""
+        return {stage.name: stage.input.dropped for stage in self.stages}
+
+    def errors(self):
+        """Frames dropped because a stage raised, by stage name."""
+        return {stage.name: stage.errors for stage in self.stages}
@@ -0,0 +1,42 @@
+"""
+Command-line entry point of the PrimePong backend.
+
+    python primepong.py serve                          # HTTP server on CAMERA_SOURCES
+    python primepong.py serve --source 0 --source 1    # Multi-camera server
+    python primepong.py serve --asgi --port 8000
+    python primepong.py track http://100.66.66.65:139/video
+    python primepong.py track match.mp4 --headless     # Score a recording, no window
+    python primepong.py multi synthetic "synthetic?occlude=left"
+    python primepong.py analyze day1/*.mp4 --out audit/   # Rescore recordings in parallel
+
+Every command only opens its cameras once it runs; the modules behind it
+(server, opencv, multi_camera, offline, detection, sources) can be imported as a
+library without side effects.
+"""
+import sys
+
+COMMANDS = {
+    "serve": ("server", "Run the HTTP server (live feed, events, scores)."),
+    "track": ("opencv", "Track one source standalone, with a window or headless."),
+    "multi": ("multi_camera", "Run fused multi-camera tracking and print score events."),
+    "analyze": ("offline", "Rescore recorded matches into event logs on a process pool."),
+}
+
+def usage():
+    lines = ["usage: python primepong.py <command> [options]", "", "commands:"]
+    lines += [f"  {name:<6} {help_text}" for name, (_, help_text) in COMMANDS.items()]
+    lines.append("")
+    lines.append("Run 'python primepong.py <command> --help' for the options of a command.")
+    return "\n".join(lines)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(usage())
+        return 0 if argv and argv[0] in ("-h", "--help") else 2
+    module = __import__(COMMANDS[argv[0]][0])
+    module.main(argv[1:])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
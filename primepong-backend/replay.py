@@ -0,0 +1,169 @@
+"""
+Instant replay: a fixed-size ring of recent camera frames in anonymous
+memory and a background exporter that writes the frames around a point to
+a video clip.
+"""
+import mmap
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+REPLAY_SECONDS = 12          # Footage kept in the ring.
+REPLAY_FPS = 30              # Frames stored per second (faster cameras are subsampled).
+REPLAY_MAX_MB = 2048         # Hard cap on the ring size: a whole clip at 1080p, fewer seconds above that.
+CLIP_BEFORE_SECONDS = 8      # Footage exported before the score event: the rally that led to the call.
+CLIP_AFTER_SECONDS = 1       # Footage exported after it.
+CLIP_FOURCC = "mp4v"
+CLIP_EXTENSION = ".mp4"
+
+# --- FRAME RING CLASS --- #
+class ReplayRing:
+    """
+    Single-writer ring of the last frames in an anonymous memory mapping (no
+    backing file, so frame copies never turn into disk writeback).
+
+    The ring is sized once, from the first frame, to at most `seconds` of
+    footage at `fps` and `max_bytes`; writing a frame copies it into its slot,
+    so memory use stays fixed and nothing is allocated per frame. A slot's
+    seq is invalidated while it is overwritten and readers re-check it after
+    copying, so a reader never returns a torn frame.
+    """
+
+    def __init__(self, seconds=REPLAY_SECONDS, fps=REPLAY_FPS, max_bytes=REPLAY_MAX_MB << 20):
+        self.seconds = seconds
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self.slots = 0
+        self.frames = None           # (slots, h, w, 3) uint8 view of the mapping, created on the first frame.
+        self.meta = None             # (slots, 2) float64: seq and timestamp per slot.
+        self.seq = -1                # Seq of the newest stored frame.
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def _allocate(self, shape):
+        frame_bytes = int(np.prod(shape))
+        self.slots = max(1, min(int(self.seconds * self.fps), self.max_bytes // frame_bytes))
+        self._mapping = mmap.mmap(-1, self.slots * frame_bytes)
+        self.frames = np.frombuffer(self._mapping, dtype=np.uint8).reshape((self.slots,) + tuple(shape))
+        self.meta = np.full((self.slots, 2), -1.0)
+
+    @property
+    def duration(self):
+        """Seconds of footage the ring holds once full."""
+        return self.slots / self.fps
+
+    def write(self, frame, timestamp):
+        """Stores the frame if the ring's frame rate is due; frames of another size are skipped."""
+        period = 1.0 / self.fps
+        if timestamp < self._next_time - period / 2:
+            return False
+        if self.frames is None:
+            self._allocate(frame.shape)
+        elif frame.shape != self.frames.shape[1:]:
+            return False
+        self._next_time = max(self._next_time, timestamp - period / 2) + period
+        seq = self.seq + 1
+        slot = seq % self.slots
+        self.meta[slot, 0] = -1
+        np.copyto(self.frames[slot], frame)
+        self.meta[slot, 1] = timestamp
+        self.meta[slot, 0] = seq
+        with self._lock:
+            self.seq = seq
+        return True
+
+    def window(self, start, end):
+        """(seq, timestamp) of the stored frames captured in [start, end], oldest first."""
+        with self._lock:
+            newest = self.seq
+        entries = []
+        for seq in range(max(newest - self.slots + 1, 0), newest + 1):
+            slot = seq % self.slots
+            timestamp = float(self.meta[slot, 1])
+            if int(self.meta[slot, 0]) == seq and start <= timestamp <= end:
+                entries.append((seq, timestamp))
+        return entries
+
+    def read(self, seq, out):
+        """Copies frame seq into out; False if it was overwritten in the meantime."""
+        slot = seq % self.slots
+        np.copyto(out, self.frames[slot])
+        return int(self.meta[slot, 0]) == seq
+
+# --- CLIP EXPORTER CLASS --- #
+class ClipExporter:
+    """
+    Exports the footage around score events to video files on a background thread.
+
+    `request(name, moment)` returns at once; the exporter waits until the
+    frames up to `moment + after` are captured, copies the window out of the
+    ring one frame at a time and writes `<name><CLIP_EXTENSION>` to `directory`.
+    `on_clip(clip)` is called with the clip's description once it is written.
+    """
+
+    def __init__(self, ring, directory, before=CLIP_BEFORE_SECONDS, after=CLIP_AFTER_SECONDS, on_clip=None):
+        self.ring = ring
+        self.directory = directory
+        self.before = before
+        self.after = after
+        self.on_clip = on_clip
+        os.makedirs(directory, exist_ok=True)
+        # Descriptions of the exported clips, oldest first; earlier runs' clips are listed by file only.
+        existing = [f for f in os.listdir(directory) if f.endswith(CLIP_EXTENSION)]
+        existing.sort(key=lambda f: os.path.getmtime(os.path.join(directory, f)))
+        self.clips = [{"file": f} for f in existing]
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="clip-exporter", daemon=True)
+        self._thread.start()
+
+    def request(self, name, moment=None, **info):
+        """Queues the export of the footage around moment (default now); info is added to the clip description."""
+        self._requests.put((name, time.time() if moment is None else moment, info))
+
+    def _run(self):
+        while True:
+            name, moment, info = self._requests.get()
+            end = moment + self.after
+            # Let the capture loop record the footage after the moment first.
+            while time.time() < end + 1.0 / self.ring.fps:
+                time.sleep(0.05)
+            try:
+                clip = self._export(name, moment - self.before, end)
+            except (OSError, cv2.error) as exc:
+                print(f"Replay export of {name} failed: {exc}")
+                continue
+            if clip is None:
+                continue
+            clip.update(info)
+            self.clips.append(clip)
+            if self.on_clip is not None:
+                self.on_clip(clip)
+
+    def _export(self, name, start, end):
+        entries = self.ring.window(start, end)
+        if not entries:
+            return None
+        if entries[0][1] > start + 1.0 / self.ring.fps:
+            print(f"Replay {name} is short: the ring holds {self.ring.duration:.1f}s at this resolution, "
+                  f"so {end - entries[0][1]:.1f}s of {end - start:.1f}s were kept (raise REPLAY_MAX_MB).")
+        h, w = self.ring.frames.shape[1:3]
+        filename = name + CLIP_EXTENSION
+        path = os.path.join(self.directory, filename)
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*CLIP_FOURCC), self.ring.fps, (w, h))
+        if not writer.isOpened():
+            raise OSError(f"cannot open {path} for writing")
+        frame = np.empty(self.ring.frames.shape[1:], dtype=np.uint8)
+        written = 0
+        try:
+            for seq, _ in entries:
+                if self.ring.read(seq, frame):
+                    writer.write(frame)
+                    written += 1
+        finally:
+            writer.release()
+        return {"file": filename, "start": entries[0][1], "end": entries[-1][1], "frames": written}
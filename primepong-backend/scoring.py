@@ -0,0 +1,269 @@
+import threading
+
+from segmentation import resolution_scale
+from table_geometry import TABLE_LENGTH_CM, TABLE_WIDTH_CM
+
+# --- CONFIGURATION --- #
+CONFIDENCE_THRESHOLD = 0.8      # Evidence the out-of-play judge needs before it calls a point.
+DOUBLE_BOUNCE_CONFIDENCE = 0.9  # Two bounces on one half within a stroke.
+FLOOR_BOUNCE_CONFIDENCE = 0.9   # A bounce beyond the padded table.
+OUT_FRAME_CONFIDENCE = 0.3      # Per frame the ball is beyond the padded table, moving away from it.
+OUT_FLYING_CONFIDENCE = 0.6     # Most a ball flying out can reach while seen: players return from there.
+LOST_FRAME_CONFIDENCE = 0.15    # Per frame the ball then stays unseen after leaving the view.
+EXIT_LOOKAHEAD_SECONDS = 0.1    # A ball vanished if its velocity would take it out of the frame this soon.
+RETURN_DISTANCE_CM = 300.0      # Beyond this distance from the table no ball is returned any more.
+STROKE_MIN_SPEED_CM_S = 100.0   # Lengthwise speed that sets the direction of a stroke.
+HIT_WINDOW_SECONDS = 0.1        # A "bounce" followed this soon by a direction change was a paddle hit.
+LIVE_ZONES = ("table", "green_margin")  # A dead ball is back in play once seen here.
+PLAYERS = {"Left": "A", "Right": "B"}   # Player at each end of the table.
+
+# --- SCORE KEEPER CLASS --- #
+class ScoreKeeper:
+    """
+    Undetected-timeout scoring rule: the multi-camera tracker scores with it,
+    and OutOfPlayJudge falls back to it when the trajectory is unclear.
+
+    Once the ball has been seen over the table, a point is awarded when it
+    stays undetected for `delay_seconds`: if it was last seen on the Left,
+    Player B scores, otherwise Player A. Time is passed in by the caller, so
+    the rule can run on live clocks or on recorded/synthetic frame timestamps.
+    """
+
+    def __init__(self, delay_seconds):
+        self.delay_seconds = delay_seconds
+        self.ball_in_bounds = False
+        self.last_detected_side = None
+        self.undetectable_start_time = None  # When the ball went undetectable
+        self.undetected_elapsed = None       # Seconds undetected, for display (None while visible)
+
+    def update(self, ball_center, side, now):
+        """
+        Feeds one frame's detection. side is "Left"/"Right", or None if the table
+        is not known. Returns the winner ("A" or "B") when a point is scored.
+        """
+        self.undetected_elapsed = None
+        if ball_center is not None:
+            self.undetectable_start_time = None  # Reset timer.
+            if side is not None:
+                self.ball_in_bounds = True
+                self.last_detected_side = side
+            return None
+
+        if not (self.ball_in_bounds and self.last_detected_side is not None):
+            self.undetectable_start_time = None
+            return None
+        if self.undetectable_start_time is None:
+            self.undetectable_start_time = now
+            return None
+
+        self.undetected_elapsed = now - self.undetectable_start_time
+        if self.undetected_elapsed < self.delay_seconds:
+            return None
+        # Award the point to the player opposite the side the ball was last seen on.
+        winner = "B" if self.last_detected_side == "Left" else "A"
+        self.reset()
+        return winner
+
+    def reset(self):
+        self.ball_in_bounds = False
+        self.last_detected_side = None
+        self.undetectable_start_time = None
+
+# --- OUT-OF-PLAY JUDGE --- #
+def _opponent(side):
+    return "Right" if side == "Left" else "Left"
+
+def _moving_away(ball_cm, velocity):
+    """True if a ball at ball_cm (table cm) is beyond an edge of the table and moving further out."""
+    x, y = ball_cm
+    vx, vy = velocity
+    return ((x < 0 and vx < 0) or (x > TABLE_LENGTH_CM and vx > 0)
+            or (y < 0 and vy < 0) or (y > TABLE_WIDTH_CM and vy > 0))
+
+def _distance_from_table(ball_cm):
+    """Distance in cm from a point on the table plane to the table (0 over the table)."""
+    x, y = ball_cm
+    dx = max(-x, x - TABLE_LENGTH_CM, 0.0)
+    dy = max(-y, y - TABLE_WIDTH_CM, 0.0)
+    return (dx * dx + dy * dy) ** 0.5
+
+def _leaving_view(ball_center, velocity, frame_shape):
+    """True if the ball's image velocity (reference pixels/s) takes it out of the frame within EXIT_LOOKAHEAD_SECONDS."""
+    if velocity is None or frame_shape is None:
+        return False
+    step = EXIT_LOOKAHEAD_SECONDS * resolution_scale(frame_shape)
+    x = ball_center[0] + velocity[0] * step
+    y = ball_center[1] + velocity[1] * step
+    return not (0 <= x < frame_shape[1] and 0 <= y < frame_shape[0])
+
+class OutOfPlayJudge:
+    """
+    Calls points from the ball's trajectory relative to the table, on frame
+    timestamps, instead of waiting for the ball to stay unseen.
+
+    A stroke is the ball travelling one way along the table, hit by the
+    player at the end it came from; the judge counts its bounces per half.
+    The point is over when the ball bounces twice on one half (that player
+    loses), bounces off the floor, or is dead beyond the padded table. Being
+    beyond the table and moving away from it is not enough, since players
+    return the ball from behind the end: the ball must then leave the view
+    (its velocity takes it out of the frame and it stays unseen) or get
+    further than RETURN_DISTANCE_CM from the table. A double or floor bounce
+    is only called once the ball keeps its direction for HIT_WINDOW_SECONDS,
+    and none counts within that window of a new stroke, since a paddle hit
+    flips the ball's vertical motion too. Each rule
+    carries a confidence (growing per frame for a ball flying out) and a
+    point is called once it reaches `threshold`.
+
+    A dead ball was good if the stroke bounced on the receiver's half, so the
+    receiver missed and the hitter wins. When that bounce was not seen (fast
+    bounces can fall between frames at low frame rates) the winner is the
+    timeout rule's: the player on the side the ball went out missed.
+
+    The ScoreKeeper timeout stays as the fallback for whatever the trajectory
+    does not explain, e.g. the ball hidden by a player. After a call the ball
+    is dead until it is seen over the table again. `last_call` holds the
+    winner, reason ("double_bounce", "floor_bounce", "out" or "timeout"),
+    confidence and timestamp of the latest point.
+    """
+
+    def __init__(self, delay_seconds, threshold=CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.fallback = ScoreKeeper(delay_seconds)
+        self.last_call = None
+        self._dead = False
+        self._new_stroke(None, None)
+
+    @property
+    def undetected_elapsed(self):
+        return self.fallback.undetected_elapsed
+
+    def _new_stroke(self, direction, timestamp):
+        self._direction = direction  # +1 towards the Right end, -1 towards the Left, None if unknown
+        self._stroke_start = timestamp
+        self._bounces = {"Left": 0, "Right": 0}
+        self._out_evidence = 0.0
+        self._out_at = None
+        self._leaving_view = False   # The last sighting was heading out of the frame.
+        self._double_bounce = None   # (side, timestamp) of a second bounce awaiting confirmation
+        self._floor_bounce = None    # (ball_cm, timestamp) of a floor bounce awaiting confirmation
+
+    def update(self, timestamp, results, trajectory, kind=None, frame_shape=None):
+        """
+        Feeds one frame's detection results, after `trajectory` was updated
+        with them (kind is what its update returned). Returns the winner
+        ("A" or "B") when a point is called. Without `frame_shape` a ball
+        leaving the view is not recognised and is left to the timeout.
+        """
+        ball_center = results["ball_center"]
+        if self._dead:
+            if ball_center is None or results.get("zone") not in LIVE_ZONES:
+                return None
+            self._dead = False
+        call = self._judge(timestamp, ball_center, results.get("zone"), results.get("ball_cm"), trajectory, kind,
+                           frame_shape)
+        if call is None:
+            winner = self.fallback.update(ball_center, results.get("side"), timestamp)
+            if winner is None:
+                return None
+            call = (winner, "timeout", 1.0)
+        winner, reason, confidence = call
+        self.last_call = {"winner": winner, "reason": reason, "confidence": round(confidence, 2),
+                          "timestamp": timestamp}
+        self.fallback.reset()
+        self._dead = True
+        self._new_stroke(None, None)
+        return winner
+
+    def _judge(self, timestamp, ball_center, zone, ball_cm, trajectory, kind, frame_shape):
+        """The (winner, reason, confidence) the trajectory supports, or None."""
+        if ball_center is None:
+            # A ball that flew out of the view and stays unseen is out of play;
+            # one that vanished inside the frame may be hidden by the player.
+            if self._out_evidence > 0 and self._leaving_view:
+                self._out_evidence += LOST_FRAME_CONFIDENCE
+        else:
+            velocity = trajectory.table_velocity
+            if velocity is not None and abs(velocity[0]) >= STROKE_MIN_SPEED_CM_S:
+                direction = 1 if velocity[0] > 0 else -1
+                if direction != self._direction:
+                    self._new_stroke(direction, timestamp)
+            if (kind in ("bounce", "floor") and self._stroke_start is not None
+                    and timestamp - self._stroke_start < HIT_WINDOW_SECONDS):
+                # The direction change is seen a little after the hit's vertical flip: that was the hit.
+                kind = None
+            if kind == "bounce" and trajectory.last_bounce["side"] is not None:
+                side = trajectory.last_bounce["side"]
+                self._bounces[side] += 1
+                if self._bounces[side] >= 2 and self._double_bounce is None:
+                    self._double_bounce = (side, timestamp)
+            if kind == "floor" and ball_cm is not None and self._floor_bounce is None:
+                self._floor_bounce = (ball_cm, timestamp)
+            if zone == "out" and ball_cm is not None and velocity is not None and _moving_away(ball_cm, velocity):
+                if _distance_from_table(ball_cm) > RETURN_DISTANCE_CM:
+                    self._out_evidence = 1.0
+                else:
+                    self._out_evidence = min(self._out_evidence + OUT_FRAME_CONFIDENCE, OUT_FLYING_CONFIDENCE)
+                self._out_at = ball_cm
+                self._leaving_view = _leaving_view(ball_center, trajectory.velocity, frame_shape)
+            else:
+                self._out_evidence = 0.0
+                self._leaving_view = False
+        if (self._double_bounce is not None and DOUBLE_BOUNCE_CONFIDENCE >= self.threshold
+                and timestamp - self._double_bounce[1] >= HIT_WINDOW_SECONDS):
+            return PLAYERS[_opponent(self._double_bounce[0])], "double_bounce", DOUBLE_BOUNCE_CONFIDENCE
+        if (self._floor_bounce is not None and FLOOR_BOUNCE_CONFIDENCE >= self.threshold
+                and timestamp - self._floor_bounce[1] >= HIT_WINDOW_SECONDS):
+            return self._dead_ball_winner(self._floor_bounce[0]), "floor_bounce", FLOOR_BOUNCE_CONFIDENCE
+        if self._out_evidence >= self.threshold:
+            return self._dead_ball_winner(self._out_at), "out", min(self._out_evidence, 1.0)
+        return None
+
+    def _dead_ball_winner(self, ball_cm):
+        """Winner of a stroke that ended with the ball out of play at ball_cm."""
+        if self._direction is not None:
+            hitter = "Left" if self._direction > 0 else "Right"
+            if self._bounces[_opponent(hitter)]:
+                return PLAYERS[hitter]
+        # No bounce seen on the receiver's half: as the timeout rule, the player on that side missed.
+        side = "Left" if ball_cm[0] < TABLE_LENGTH_CM / 2 else "Right"
+        return PLAYERS[_opponent(side)]
+
+# --- MATCH STATE CLASS --- #
+class MatchState:
+    """
+    Running match state derived from the event stream.
+
+    Applying every journalled event in order rebuilds the state after a
+    restart: "score" events add a point, "reset" starts a new match and
+    "side" events track where the ball was last seen.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.score = {"A": 0, "B": 0}
+        self.last_side = None
+        self.last_event_id = 0
+        self.started_at = None
+
+    def apply(self, event):
+        with self._lock:
+            kind = event["type"]
+            if kind == "score":
+                self.score[event["winner"]] += 1
+            elif kind == "reset":
+                self.reset()
+                self.started_at = event["timestamp"]
+            elif kind == "side":
+                self.last_side = event["side"]
+            if self.started_at is None:
+                self.started_at = event["timestamp"]
+            self.last_event_id = event["id"]
+
+    def to_dict(self):
+        with self._lock:
+            return {"score": dict(self.score), "last_side": self.last_side,
+                    "started_at": self.started_at, "last_event_id": self.last_event_id}
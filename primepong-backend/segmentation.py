@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+REFERENCE_WIDTH = 640      # Frame width the base kernel and pixel thresholds were tuned at.
+BASE_KERNEL = 5            # Morphology kernel size at REFERENCE_WIDTH.
+REFINE_MARGIN = 2          # Coarse pixels added around a candidate before refining it.
+
+_kernels = {}
+
+def resolution_scale(shape):
+    """Linear size of a frame relative to REFERENCE_WIDTH; pixel thresholds scale with it."""
+    return shape[1] / REFERENCE_WIDTH
+
+def scaled_kernel(scale):
+    """Square morphology kernel of BASE_KERNEL scaled to the resolution (odd, at least 3)."""
+    size = max(3, int(round(BASE_KERNEL * scale)) | 1)
+    kernel = _kernels.get(size)
+    if kernel is None:
+        kernel = _kernels[size] = np.ones((size, size), np.uint8)
+    return kernel
+
+def segment(labels, class_id, scale):
+    """
+    Binary mask of one class of a label image, cleaned with a closing and an opening at the given scale.
+
+    Closing first fills single-pixel holes inside a blob, which would
+    otherwise make a large opening kernel erase the blob entirely.
+    """
+    mask = cv2.compare(labels, class_id, cv2.CMP_EQ)
+    kernel = scaled_kernel(scale)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+def _contours(labels, class_id, scale, offset_x=0, offset_y=0):
+    mask = segment(labels, class_id, scale)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE,
+                                   offset=(offset_x, offset_y))
+    return list(contours)
+
+def _merge_boxes(boxes):
+    """Merges overlapping (x0, y0, x1, y1) boxes until they are disjoint."""
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for box in boxes:
+            for i, other in enumerate(out):
+                if box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]:
+                    out[i] = (min(box[0], other[0]), min(box[1], other[1]),
+                              max(box[2], other[2]), max(box[3], other[3]))
+                    merged = True
+                    break
+            else:
+                out.append(box)
+        boxes = out
+    return boxes
+
+# --- BLOB SEARCH --- #
+def find_blobs(ctx, class_id, min_area=0, roi=None, coarse=True, limit=None):
+    """
+    Contours (in frame coordinates) of the blobs of one colour class.
+
+    `min_area` is in pixels at REFERENCE_WIDTH and scales with the frame. With
+    `roi` (x0, y0, x1, y1) only that region is segmented, at full resolution.
+    Otherwise, with `coarse`, candidates are found on the context's downscaled
+    frame and only their neighbourhoods are segmented at full resolution, so
+    the cost grows with the coarse frame and the blobs, not the pixel count.
+    `limit` refines only the largest `limit` coarse candidates.
+    """
+    scale = resolution_scale(ctx.shape)
+    if roi is not None:
+        x0, y0, x1, y1 = roi
+        return _contours(ctx.labels_region(roi), class_id, scale, x0, y0)
+    factor = ctx.coarse_factor
+    if not coarse or factor == 1:
+        return _contours(ctx.labels, class_id, scale)
+
+    labels_coarse = ctx.labels_coarse
+    candidates = _contours(labels_coarse, class_id, resolution_scale(labels_coarse.shape))
+    # Keep anything that could still pass min_area once refined.
+    coarse_min_area = 0.5 * min_area * (scale / factor) ** 2
+    candidates = [(cv2.contourArea(cnt), cnt) for cnt in candidates]
+    candidates = [(area, cnt) for area, cnt in candidates if area >= coarse_min_area]
+    candidates.sort(key=lambda item: item[0], reverse=True)
+    if limit is not None:
+        candidates = candidates[:limit]
+
+    h, w = ctx.shape[:2]
+    margin = REFINE_MARGIN * factor + scaled_kernel(scale).shape[0]
+    boxes = []
+    for _, cnt in candidates:
+        x, y, bw, bh = cv2.boundingRect(cnt)
+        boxes.append((max(int(x * factor - margin), 0), max(int(y * factor - margin), 0),
+                      min(int((x + bw) * factor + margin), w), min(int((y + bh) * factor + margin), h)))
+    contours = []
+    for x0, y0, x1, y1 in _merge_boxes(boxes):
+        contours.extend(_contours(ctx.labels_region((x0, y0, x1, y1)), class_id, scale, x0, y0))
+    return contours
@@ -0,0 +1,245 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+# --- CONFIGURATION --- #
+BUFFER_CAPACITY = 4096        # Samples kept per paddle (~20 s at 200 Hz).
+FORCE_THRESHOLD = 0.5         # Force reading at or above this counts as contact.
+HIT_DEBOUNCE_SECONDS = 0.15   # Minimum time between two hits on the same paddle.
+OFFSET_WINDOW = 64            # Recent batches whose smallest clock offset maps device time.
+CLOCK_JUMP_SECONDS = 1.0      # Offset jump (or device time going backwards) taken as a paddle reboot.
+BASELINE_G = 1.0              # Accelerometer magnitude at rest (~1 g).
+MOVEMENT_THRESHOLDS = (       # Deviation from baseline -> movement label (matches the firmware).
+    (0.05, "not moving"),
+    (0.1, "slow"),
+    (0.2, "fast"),
+)
+SWING_MOVEMENT = "very fast"
+
+SAMPLE_FIELDS = ("force", "ax", "ay", "az")
+
+def movement_label(accel_magnitude):
+    """Classifies an accelerometer magnitude (in g) the same way the paddle firmware does."""
+    diff = abs(accel_magnitude - BASELINE_G)
+    for threshold, label in MOVEMENT_THRESHOLDS:
+        if diff < threshold:
+            return label
+    return SWING_MOVEMENT
+
+# --- PADDLE RING BUFFER CLASS --- #
+class PaddleBuffer:
+    """
+    Fixed-capacity, array-backed ring buffer of samples for one paddle.
+
+    Columns are preallocated NumPy arrays (time, force, ax, ay, az); batches
+    are written with at most two slice assignments, so ingest never
+    allocates per sample.
+    """
+
+    def __init__(self, capacity=BUFFER_CAPACITY):
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype="float64")
+        self.columns = {name: np.zeros(capacity, dtype="float32") for name in SAMPLE_FIELDS}
+        self.count = 0              # Total samples ever written.
+
+    def append(self, t, values):
+        """Appends a batch: t is an array of times, values maps field name to an array."""
+        n = len(t)
+        if n > self.capacity:
+            # Only the newest `capacity` samples can be kept.
+            t = t[-self.capacity:]
+            values = {name: column[-self.capacity:] for name, column in values.items()}
+            self.count += n - self.capacity
+            n = self.capacity
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        self.t[start:start + first] = t[:first]
+        self.t[:n - first] = t[first:]
+        for name, column in self.columns.items():
+            column[start:start + first] = values[name][:first]
+            column[:n - first] = values[name][first:]
+        self.count += n
+
+    def latest(self, n=1):
+        """Returns (t, values) of the newest n samples in time order."""
+        n = min(n, self.count, self.capacity)
+        idx = (np.arange(self.count - n, self.count)) % self.capacity
+        return self.t[idx], {name: column[idx] for name, column in self.columns.items()}
+
+# --- PADDLE STATE CLASS --- #
+class PaddleState:
+    """Buffer plus edge-detection state for one paddle."""
+
+    def __init__(self, paddle_id, capacity):
+        self.paddle_id = paddle_id
+        self.buffer = PaddleBuffer(capacity)
+        self.clock_offset = None    # server_time - device_time, from the least-delayed recent batch.
+        self.offsets = collections.deque(maxlen=OFFSET_WINDOW)
+        self.last_device_time = None
+        self.hits = 0
+        self.last_seen = None
+        self.reset_clock()
+
+    def reset_clock(self):
+        """Forgets the clock mapping and edge state, e.g. after the paddle rebooted and its clock restarted."""
+        self.clock_offset = None
+        self.offsets.clear()
+        self.last_device_time = None
+        self.last_force = 0.0
+        self.last_hit_time = -np.inf
+        self.swinging = False
+
+# --- SENSOR HUB CLASS --- #
+class SensorHub:
+    """
+    Collects paddle telemetry and detects hits server-side.
+
+    Paddles (or the bridge/simulator) send batches of samples. Each batch is
+    mapped onto server time, stored in the paddle's ring buffer, and scanned
+    with vectorized rising-edge detection. Hits and swings are published on
+    the shared EventStream next to the vision score events.
+    """
+
+    def __init__(self, events, capacity=BUFFER_CAPACITY):
+        self.events = events
+        self.capacity = capacity
+        self.paddles = {}
+        self._lock = threading.Lock()
+
+    def _paddle(self, paddle_id):
+        paddle = self.paddles.get(paddle_id)
+        if paddle is None:
+            paddle = self.paddles[paddle_id] = PaddleState(paddle_id, self.capacity)
+        return paddle
+
+    def ingest(self, paddle_id, batch, received_at=None):
+        """
+        Ingests a batch of samples for a paddle and returns the published hit events.
+
+        batch is a column dict: {"t": [...], "force": [...], "ax": [...], "ay": [...],
+        "az": [...]} with t in device seconds, plus an optional "sent_at" (device
+        seconds when the batch was sent). Without "sent_at", the newest sample is
+        assumed to have been taken on receipt.
+        """
+        received_at = time.time() if received_at is None else received_at
+        t = np.asarray(batch["t"], dtype="float64")
+        if t.size == 0:
+            return []
+        try:
+            values = {name: np.asarray(batch[name], dtype="float32") for name in SAMPLE_FIELDS}
+        except KeyError as exc:
+            raise ValueError(f"batch is missing field {exc}") from None
+        if any(column.shape != t.shape for column in values.values()):
+            raise ValueError("batch columns must all have the same length")
+
+        with self._lock:
+            paddle = self._paddle(paddle_id)
+
+            # Map device time to server time. The smallest recent offset is the
+            # batch with the least network delay, so it is the best estimate;
+            # a clock that went backwards or jumped means the paddle restarted.
+            sent_at = float(batch.get("sent_at", t[-1]))
+            offset = received_at - sent_at
+            if paddle.clock_offset is not None and (
+                    t[0] < paddle.last_device_time or offset - paddle.clock_offset > CLOCK_JUMP_SECONDS):
+                paddle.reset_clock()
+            paddle.offsets.append(offset)
+            paddle.clock_offset = min(paddle.offsets)
+            paddle.last_device_time = float(t[-1])
+            t = t + paddle.clock_offset
+
+            paddle.buffer.append(t, values)
+            paddle.last_seen = received_at
+            return self._detect(paddle, t, values)
+
+    def _detect(self, paddle, t, values):
+        force = values["force"]
+        contact = force >= FORCE_THRESHOLD
+        previous = np.concatenate(([paddle.last_force >= FORCE_THRESHOLD], contact[:-1]))
+        edges = np.flatnonzero(contact & ~previous)
+        paddle.last_force = float(force[-1])
+
+        magnitude = np.sqrt(values["ax"] ** 2 + values["ay"] ** 2 + values["az"] ** 2)
+        published = []
+        for i in edges:
+            if t[i] - paddle.last_hit_time < HIT_DEBOUNCE_SECONDS:
+                continue
+            paddle.last_hit_time = t[i]
+            paddle.hits += 1
+            published.append(self.events.publish(
+                "hit", paddle=paddle.paddle_id, sample_time=float(t[i]),
+                accel=float(magnitude[i]), movement=movement_label(float(magnitude[i]))))
+
+        # Swings are reported once when the paddle starts moving very fast.
+        swinging = movement_label(float(magnitude.max())) == SWING_MOVEMENT
+        if swinging and not paddle.swinging:
+            peak = int(np.argmax(magnitude))
+            self.events.publish("swing", paddle=paddle.paddle_id, sample_time=float(t[peak]),
+                                accel=float(magnitude[peak]))
+        paddle.swinging = swinging
+        return published
+
+    def state(self):
+        """Latest reading and hit count of every paddle, keyed by paddle id."""
+        with self._lock:
+            result = {}
+            for paddle_id, paddle in self.paddles.items():
+                t, values = paddle.buffer.latest(1)
+                ax, ay, az = (float(values[name][0]) for name in ("ax", "ay", "az"))
+                result[paddle_id] = {
+                    "sample_time": float(t[0]),
+                    "force_value": float(values["force"][0]),
+                    "accel_x": ax,
+                    "accel_y": ay,
+                    "accel_z": az,
+                    "movement": movement_label(float(np.sqrt(ax * ax + ay * ay + az * az))),
+                    "hits": paddle.hits,
+                    "last_seen": paddle.last_seen,
+                }
+            return result
+
+# --- HTTP POLLING BRIDGE --- #
+class PaddlePoller:
+    """
+    Bridge for paddles running the current firmware, which only serves its
+    latest reading over HTTP: one backend thread polls each paddle and feeds
+    the readings into the hub, instead of every browser polling every paddle.
+    """
+
+    def __init__(self, hub, paddle_id, url, interval=0.05):
+        self.hub = hub
+        self.paddle_id = paddle_id
+        self.url = url
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def _poll_loop(self):
+        import requests
+
+        session = requests.Session()
+        online = True
+        while not self._stop_event.is_set():
+            try:
+                data = session.get(self.url, timeout=1.0).json()
+                now = time.time()
+                self.hub.ingest(self.paddle_id, {
+                    "t": [now], "force": [data["force_value"]],
+                    "ax": [data["accel_x"]], "ay": [data["accel_y"]], "az": [data["accel_z"]],
+                }, received_at=now)
+                if not online:
+                    print(f"Paddle {self.paddle_id} back online.")
+                online = True
+            except (requests.RequestException, ValueError, KeyError) as exc:
+                if online:
+                    print(f"Paddle {self.paddle_id} unreachable at {self.url}: {exc}")
+                online = False
+            self._stop_event.wait(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self._poll_loop, name=f"paddle-{self.paddle_id}", daemon=True)
+        thread.start()
+
+    def stop(self):
+        self._stop_event.set()
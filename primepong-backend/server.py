@@ -1,258 +1,432 @@
+import argparse
+import atexit
 import cv2
-import numpy as np
+import os
 import time
 import threading
-from flask import Flask, Response, jsonify
+from flask import Flask, Response, abort, jsonify, make_response, request, send_from_directory
+
+from broadcast import (SSE_KEEPALIVE_SECONDS, EventStream, FrameBroadcaster, mjpeg_part,
+                       parse_event_id, sse_message)
+from detection import DetectionCore, annotate
+from detection_pool import DetectionPool, default_workers
+from grabber import FrameGrabber
+from journal import Journal
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, Registry
+from motion_gate import MotionGate
+from multi_camera import MultiCameraTracker
+from pipeline import Pipeline, Stage
+from replay import ClipExporter, ReplayRing
+from scoring import MatchState, OutOfPlayJudge
+from segmentation import resolution_scale
+from sensor_hub import PaddlePoller, SensorHub
+from table_geometry import TableGeometry
+from trajectory import Trajectory
 
 # --- CONFIGURATION --- #
-MIN_DISTANCE_PIXELS = 50  # Adjust based on your calibration
-PIXELS_PER_CM = 10         # Example: 10 pixels ~ 1 cm.
 PURPLE_PADDING_CM = 5      # Purple padded rectangle: 5 cm padding.
 GREEN_PADDING_CM = 1       # Green table rectangle: 1 cm padding.
-DELAY_SECONDS = 3          # Delay before scoring after ball is undetectable
+DELAY_SECONDS = 3          # Delay before scoring after ball is undetectable, when the trajectory is unclear
+OUT_OF_PLAY_CONFIDENCE = 0.8  # Confidence the ball's trajectory needs to call a point (see OutOfPlayJudge).
+# Camera indices, stream URLs (e.g. iVCam), video files or synthetic scenes.
+# More than one source runs each camera's detection in its own process and
+# scores on the fused ball; the live feed shows the first camera.
+CAMERA_SOURCES = [2]
+# Tables hosted by this server: table id -> camera sources. Every table is served on
+# /tables/<id>/..., and the first also on the unprefixed routes (/video_feed, ...).
+TABLES = {"1": CAMERA_SOURCES}
+# With several single-camera tables, their detection runs on one shared pool of
+# worker processes; None starts one worker per core, less one, up to one per table.
+POOL_WORKERS = None
+BALL_TRACKING = True       # Search only a predicted window around the ball between frames.
+TABLE_LOCK = True          # Freeze the table once its markers are stable; re-verify at low cadence.
+COARSE_TO_FINE = True      # Find candidates on a downscaled frame, refine only those at full resolution.
+MOTION_GATE = True         # While nothing in view moves, detect and encode only a few frames a second.
+ANNOTATE_WORKERS = 1       # Threads drawing annotations onto detected frames.
+ENCODE_WORKERS = 2         # Threads JPEG-encoding annotated frames.
+# Live feed tiers, picked with /video_feed?tier=<name>: (scale, JPEG quality, max fps or None).
+# A tier is only encoded while it has viewers, once per frame, and shared by all of them.
+VIDEO_TIERS = {
+    "full": (1.0, 95, None),
+    "half": (0.5, 80, 30),
+    "thumb": (0.25, 60, 10),
+}
+DEFAULT_VIDEO_TIER = "full"
+METRICS_ENABLED = True     # Per-stage timing and counters served on /metrics.
+# Paddles running the HTTP-polling firmware, bridged into the sensor hub.
+# Paddles that push sample batches to /paddles/<id>/samples need no entry here.
+PADDLE_URLS = {
+    "A": "http://172.20.10.13/",
+    "B": "http://172.20.10.12/",
+}
+PADDLE_POLL_SECONDS = 0.05
+# Append-only log of every event; the match state is rebuilt from it on startup.
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "match_journal.jsonl")
+JOURNAL_FSYNC = True       # fsync each group commit; off trades crash safety for less disk I/O.
+HISTORY_PAGE_SIZE = 100    # Default page size of /events/history.
+# Instant replay: the last REPLAY_SECONDS of raw frames stay in a fixed-size ring in memory
+# (never more than REPLAY_MAX_MB, a whole clip at 1080p) and the footage around every point
+# is saved to REPLAY_DIR.
+REPLAY_SECONDS = 12
+REPLAY_FPS = 30
+REPLAY_MAX_MB = 2048
+REPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replays")
 
 # --- GAME TRACKER CLASS --- #
 class GameTracker:
-    def __init__(self):
+    """
+    Match tracking behind the server: capture, detection, scoring and the live feed.
+
+    Creating a tracker only sets up its state; `start()` opens the camera
+    sources (CAMERA_SOURCES by default) and starts the background threads.
+    Each table of a multi-table server has its own tracker, journal and
+    replay directory; `core` replaces its DetectionCore, e.g. with a
+    PooledDetector of the shared detection pool.
+    """
+
+    def __init__(self, sources=None, table_id=None, core=None, paddles=None,
+                 journal_path=JOURNAL_PATH, replay_dir=REPLAY_DIR):
+        self.sources = list(sources or CAMERA_SOURCES)
+        self.table_id = table_id
+        self.paddles = dict(paddles or {})  # Paddle id -> URL of the polled paddles of this table
         # State variables
-        self.latest_frame = None          # Latest JPEG-encoded frame (annotated)
+        # Latest JPEG-encoded frame (annotated) of each video tier, versioned by capture seq
+        self.frames = {tier: FrameBroadcaster() for tier in VIDEO_TIERS}
+        self._tier_due = {tier: 0.0 for tier in VIDEO_TIERS}  # Earliest capture time of the next frame per tier
+        self._tier_lock = threading.Lock()
         self.latest_score_event = None      # Latest score event (dict: e.g. {"winner": "A", "timestamp": ...})
-        self.ball_in_bounds = False
-        self.last_detected_side = None
-        self.undetectable_start_time = None  # When the ball went undetectable
-
-        # Initialize camera
-        self.cap = cv2.VideoCapture(2)
-        if not self.cap.isOpened():
-            raise RuntimeError("Could not open webcam.")
-
-        # Create our table detector instance
-        self.detector = self.TableDetector()
-
-        # Pre-calculate padding values in pixels.
-        self.purple_padding_pixels = int(PURPLE_PADDING_CM * PIXELS_PER_CM)
-        self.green_padding_pixels = int(GREEN_PADDING_CM * PIXELS_PER_CM)
-
-        # Start the detection loop in a background thread.
-        self._start_detection_thread()
-
-    def _start_detection_thread(self):
-        thread = threading.Thread(target=self._detection_loop, daemon=True)
-        thread.start()
-
-    # --- UTILITY FUNCTIONS --- #
-    def adjust_lighting(self, frame):
-        """Adjust lighting using histogram equalization on the Y channel of YCrCb."""
-        ycrcb = cv2.cvtColor(frame, cv2.COLOR_BGR2YCrCb)
-        y, cr, cb = cv2.split(ycrcb)
-        y_eq = cv2.equalizeHist(y)
-        ycrcb_eq = cv2.merge((y_eq, cr, cb))
-        return cv2.cvtColor(ycrcb_eq, cv2.COLOR_YCrCb2BGR)
-
-    # --- INNER TABLE DETECTOR CLASS --- #
-    class TableDetector:
-        def __init__(self):
-            self.tracked_markers = None
-
-        def order_points(self, pts):
-            """Order 4 points as top-left, top-right, bottom-right, bottom-left."""
-            rect = np.zeros((4, 2), dtype="float32")
-            s = pts.sum(axis=1)
-            rect[0] = pts[np.argmin(s)]
-            rect[2] = pts[np.argmax(s)]
-            diff = np.diff(pts, axis=1)
-            rect[1] = pts[np.argmin(diff)]
-            rect[3] = pts[np.argmax(diff)]
-            return rect
-
-        def remove_close_points(self, points, min_distance):
-            """Remove points that are too close together."""
-            if len(points) == 0:
-                return points
-            filtered = []
-            for pt in points:
-                if any(np.linalg.norm(pt - np.array(existing)) < min_distance for existing in filtered):
-                    continue
-                filtered.append(pt)
-            return np.array(filtered, dtype="float32")
-
-        def detect_blue_markers(self, frame, adjust_func):
-            """Detect blue markers and return centroids."""
-            frame_adj = adjust_func(frame)
-            hsv = cv2.cvtColor(frame_adj, cv2.COLOR_BGR2HSV)
-            lower_blue = np.array([100, 150, 50])
-            upper_blue = np.array([140, 255, 255])
-            mask = cv2.inRange(hsv, lower_blue, upper_blue)
-            kernel = np.ones((5, 5), np.uint8)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-            contours, _ = cv2.findContours(mask.copy(), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            centroids = []
-            for cnt in contours:
-                if cv2.contourArea(cnt) > 50:
-                    M = cv2.moments(cnt)
-                    if M["m00"] != 0:
-                        cx = int(M["m10"] / M["m00"])
-                        cy = int(M["m01"] / M["m00"])
-                        centroids.append([cx, cy])
-            if len(centroids) == 0:
-                return None
-            centroids = np.array(centroids, dtype="float32")
-            centroids = self.remove_close_points(centroids, MIN_DISTANCE_PIXELS)
-            return centroids
-
-        def update_tracked_markers(self, tracked, detected, threshold=50, alpha=0.3):
-            """Update tracked marker positions smoothly."""
-            updated = tracked.copy()
-            used = np.zeros(len(detected), dtype=bool)
-            for i in range(4):
-                best_idx = -1
-                best_dist = float('inf')
-                for j in range(len(detected)):
-                    if used[j]:
-                        continue
-                    dist = np.linalg.norm(tracked[i] - detected[j])
-                    if dist < best_dist:
-                        best_dist = dist
-                        best_idx = j
-                if best_idx != -1 and best_dist < threshold:
-                    used[best_idx] = True
-                    updated[i] = alpha * detected[best_idx] + (1 - alpha) * tracked[i]
-            return updated
-
-        def process_frame(self, frame, adjust_func):
-            """
-            Processes the frame and, if 4 markers are detected,
-            returns the table's vertices as a list of 4 [x, y] pairs.
-            """
-            detected = self.detect_blue_markers(frame, adjust_func)
-            if detected is not None:
-                if self.tracked_markers is None:
-                    if detected.shape[0] == 4:
-                        self.tracked_markers = self.order_points(detected)
-                else:
-                    self.tracked_markers = self.update_tracked_markers(self.tracked_markers, detected)
-            if self.tracked_markers is not None:
-                return self.tracked_markers.astype(int).tolist()
-            return None
-
-    # --- BALL DETECTION --- #
-    def detect_orange_ball(self, frame):
-        """Detects the orange ball and returns its center and radius."""
-        frame_adj = self.adjust_lighting(frame)
-        hsv = cv2.cvtColor(frame_adj, cv2.COLOR_BGR2HSV)
-        lower_orange = np.array([0, 80, 80])
-        upper_orange = np.array([25, 255, 255])
-        mask = cv2.inRange(hsv, lower_orange, upper_orange)
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        if len(contours) == 0:
-            return None, None
-        largest_contour = max(contours, key=cv2.contourArea)
-        ((x, y), radius) = cv2.minEnclosingCircle(largest_contour)
-        if radius < 2:
-            return None, None
-        return (int(x), int(y)), int(radius)
-
-    def determine_ball_side(self, ball_center, table_vertices):
+        # Every event, with monotonic ids, for push subscribers; journalled so it survives restarts
+        self.journal = Journal(journal_path, fsync=JOURNAL_FSYNC)
+        atexit.register(self.journal.close)
+        self.events = EventStream(journal=self.journal)
+        self.match = MatchState()
+        for event in self.journal.replay():
+            self.match.apply(event)
+        self._ball_visible = False          # Last journalled ball visibility and side, to log transitions only
+        self._ball_side = self.match.last_side
+        # Calls points from the ball's trajectory on frame timestamps; the undetected timeout is its fallback.
+        self.judge = OutOfPlayJudge(DELAY_SECONDS, OUT_OF_PLAY_CONFIDENCE)
+        self.trajectory = Trajectory()      # Ball history with speed, bounce and rally analytics
+        # Raw frames of the last seconds, and the background writer of each point's replay clip
+        self.replay = ReplayRing(REPLAY_SECONDS, REPLAY_FPS, REPLAY_MAX_MB << 20)
+        self.clips = ClipExporter(self.replay, replay_dir, on_clip=self._on_clip)
+        # Paddle telemetry: hits are detected here and pushed on the same event stream.
+        self.sensor_hub = SensorHub(self.events)
+
+        # Table and ball detection, shared with the standalone tracker (opencv.py).
+        self.core = core or DetectionCore(BALL_TRACKING, TABLE_LOCK, COARSE_TO_FINE,
+                                          GREEN_PADDING_CM, PURPLE_PADDING_CM)
+        # Outlines of the first camera's table in multi-camera mode, where detection runs in the camera processes.
+        self.geometry = TableGeometry(GREEN_PADDING_CM, PURPLE_PADDING_CM)
+        # Single-camera mode: skips full detection of still frames (see motion_gate.py).
+        self.motion_gate = MotionGate() if MOTION_GATE else None
+        self._cpu_sample = None             # (wall, process CPU) time at the last detect stage
+        self._cpu_usage = 0.0               # Smoothed process CPU use, in cores
+        self.cap = None
+        self.cameras = None
+        self.pipeline = None
+        self._init_metrics()
+
+    def start(self):
+        """Opens the camera source(s) and starts the pipeline and paddle pollers."""
+        if len(self.sources) > 1:
+            self.cameras = MultiCameraTracker(self.sources, DELAY_SECONDS, on_score=self.trigger_score_event,
+                                              ball_tracking=BALL_TRACKING, table_lock=TABLE_LOCK)
+            self.cameras.start()
+            self._camera_seq = -1
+        else:
+            # Drained on its own thread: detection always gets the newest frame and
+            # the stream is reopened with backoff when it drops.
+            self.cap = FrameGrabber(self.sources[0])
+            if not self.cap.isOpened():
+                raise RuntimeError(f"Could not open camera source {self.sources[0]!r}.")
+
+        # Start the capture/detect/annotate/encode pipeline in background threads.
+        self._start_pipeline()
+        for paddle_id, url in self.paddles.items():
+            PaddlePoller(self.sensor_hub, paddle_id, url, PADDLE_POLL_SECONDS).start()
+        return self
+
+    def _init_metrics(self):
+        """Creates the hot-path metrics (no-ops when METRICS_ENABLED is False)."""
+        self.metrics = Registry(enabled=METRICS_ENABLED)
+        self.stage_seconds = self.metrics.histogram(
+            "primepong_stage_seconds", "Time spent in each stage of the detection loop.", labels=("stage",))
+        self.end_to_end_seconds = self.metrics.histogram(
+            "primepong_end_to_end_seconds", "Capture-to-encode latency of published frames.")
+        self.frames_captured = self.metrics.counter(
+            "primepong_frames_captured_total", "Frames read from the camera.")
+        self.capture_failures = self.metrics.counter(
+            "primepong_capture_failures_total", "Seconds the camera delivered no frame.")
+        self.detection_timeouts = self.metrics.counter(
+            "primepong_detection_timeouts_total", "Frames dropped because the detection pool did not answer in time.")
+        self.frames_gated = self.metrics.counter(
+            "primepong_frames_gated_total", "Still frames skipped by the motion gate.")
+        self.cpu_seconds = self.metrics.counter(
+            "primepong_cpu_seconds_total", "Process CPU time while detection ran at full rate or idled.",
+            labels=("mode",))
+        self.cpu_usage = self.metrics.gauge(
+            "primepong_cpu_usage_ratio", "Recent process CPU use, in cores.")
+        self.metrics.callback(
+            "primepong_motion_idle", "1 while the motion gate idles detection.", "gauge",
+            lambda: {(): int(self.motion_gate.idle)} if self.motion_gate else {})
+        self.stream_lag = self.metrics.histogram(
+            "primepong_stream_lag_seconds", "Age of each frame when detection starts on it.")
+        self.viewers = self.metrics.gauge(
+            "primepong_video_viewers", "Connected /video_feed viewers.")
+        self.frames_encoded = self.metrics.counter(
+            "primepong_frames_encoded_total", "Frames JPEG-encoded for the live feed.", labels=("tier",))
+        self.metrics.callback(
+            "primepong_frames_dropped_total", "Frames dropped because a stage queue was full.", "counter",
+            lambda: {(name,): dropped for name, dropped in self.pipeline.dropped().items()} if self.pipeline else {},
+            labels=("stage",))
+        self.metrics.callback(
+            "primepong_stage_errors_total", "Frames dropped because a stage raised an error.", "counter",
+            lambda: {(name,): errors for name, errors in self.pipeline.errors().items()} if self.pipeline else {},
+            labels=("stage",))
+        self.metrics.callback(
+            "primepong_camera_frames_total", "Frames processed by each camera process.", "counter",
+            lambda: {(str(i),): n for i, n in enumerate(self.cameras.frames_processed)} if self.cameras else {},
+            labels=("camera",))
+        self.metrics.callback(
+            "primepong_stream_connected", "1 while the camera stream is connected.", "gauge",
+            lambda: {(): int(self.cap.connected)} if self.cap else {})
+        self.metrics.callback(
+            "primepong_stream_reconnects_total", "Times the camera stream was reopened after dropping.",
+            "counter", lambda: {(): self.cap.reconnects} if self.cap else {})
+        self.metrics.callback(
+            "primepong_stream_frames_skipped_total", "Camera frames replaced by a newer one before detection.",
+            "counter", lambda: {(): self.cap.skipped} if self.cap else {})
+        self.metrics.callback(
+            "primepong_table_locked", "1 while the table geometry is locked.", "gauge",
+            lambda: {(): int(self.core.locked)})
+
+    def _start_pipeline(self):
+        # Detection keeps scoring state, so it runs on one worker and only ever
+        # sees the freshest frame; annotation and encoding are stateless.
+        if self.cameras is not None:
+            # Detection already ran in the camera processes.
+            source, detect = self._read_camera_frame, self._fused_detect_stage
+        else:
+            source, detect = self._read_frame, self._detect_stage
+        self.pipeline = Pipeline(source, [
+            Stage("detect", detect, workers=1, maxsize=1),
+            Stage("annotate", self._annotate_stage, workers=ANNOTATE_WORKERS, maxsize=2),
+            Stage("encode", self._encode_stage, workers=ENCODE_WORKERS, maxsize=2),
+        ])
+        self.pipeline.start()
+
+    # --- EVENTS --- #
+    def trigger_score_event(self, winner, **call):
         """
-        Determines if the ball is on the left or right side of the table based on its centroid.
+        Called when a score event occurs; call carries how the point was called (reason, confidence).
+        Pushes it to the event stream and updates latest_score_event.
         """
-        table_arr = np.array(table_vertices, dtype="float32")
-        centroid = table_arr.mean(axis=0)
-        return "Left" if ball_center[0] < centroid[0] else "Right"
+        event = self.publish_event("score", winner=winner, **call)
+        self.latest_score_event = {"winner": winner, "timestamp": event["timestamp"]}
+        # Exported in the background once the footage after the point is captured.
+        self.clips.request(f"point-{event['id']}-{winner}", event["timestamp"],
+                           score_event_id=event["id"], winner=winner)
+        print(f"Score event! Player {winner} scores.")
+
+    def publish_event(self, event_type, **data):
+        """Publishes a match event to the stream (and journal) and applies it to the match state."""
+        event = self.events.publish(event_type, **data)
+        self.match.apply(event)
+        return event
 
-    def trigger_score_event(self, winner):
+    def _on_clip(self, clip):
+        """Called by the clip exporter once a replay clip is written."""
+        self.publish_event("replay", **clip)
+
+    def _publish_transitions(self, ball_center, side, ball_cm):
+        """Journals the ball appearing or disappearing and crossing the net, not every detection."""
+        visible = ball_center is not None
+        if visible != self._ball_visible:
+            self._ball_visible = visible
+            self.publish_event("ball", visible=visible, side=side, ball_cm=ball_cm)
+        if side is not None and side != self._ball_side:
+            self._ball_side = side
+            self.publish_event("side", side=side, ball_cm=ball_cm)
+
+    def _update_trajectory(self, timestamp, results, frame_shape):
         """
-        Called when a score event occurs.
-        Updates latest_score_event.
+        Feeds the ball position to the trajectory analytics; journals bounces and finished rallies.
+        Returns what the trajectory update reported.
         """
-        self.latest_score_event = {"winner": winner, "timestamp": time.time()}
-        print(f"Score event! Player {winner} scores.")
-
-    # --- DETECTION LOOP (Background Thread) --- #
-    def _detection_loop(self):
-        while True:
-            ret, frame = self.cap.read()
+        kind = self.trajectory.update(timestamp, results["ball_center"], resolution_scale(frame_shape),
+                                      results.get("ball_cm"), results.get("zone"), results.get("side"))
+        if kind == "bounce":
+            bounce = dict(self.trajectory.last_bounce)
+            # The frame's capture time; the event's own timestamp stays the publish time, keeping the journal ordered.
+            bounce["sample_time"] = bounce.pop("timestamp")
+            self.publish_event("bounce", **bounce)
+        elif kind == "rally":
+            self.publish_event("rally", **self.trajectory.last_rally)
+        if self.trajectory.speed is not None:
+            results["speed_cm_s"] = self.trajectory.speed
+        return kind
+
+    # --- PIPELINE STAGES (Background Threads) --- #
+    def _read_frame(self):
+        """Capture stage: the newest camera frame and when it was grabbed, or None if none came."""
+        ret, frame = self.cap.read(timeout=1.0)
+        if not ret:
+            if self.cap.ended:
+                print("Camera source ended.")
+                self.pipeline.stop()
+            else:
+                self.capture_failures.inc()
+            return None
+        # Wall-clock grab time, whatever clock the source itself keeps.
+        timestamp = time.time() - self.cap.lag
+        self.frames_captured.inc()
+        self.replay.write(frame, timestamp)
+        return frame, timestamp
+
+    def _read_camera_frame(self):
+        """Capture stage in multi-camera mode: the newest frame of the first camera."""
+        seq, timestamp, frame = self.cameras.latest_frame(0, timeout=1.0)
+        if frame is None or seq == self._camera_seq:
+            time.sleep(0.002)
+            return None
+        self._camera_seq = seq
+        self.frames_captured.inc()
+        self.replay.write(frame, timestamp)
+        return frame, timestamp
+
+    def _fused_detect_stage(self, packet):
+        """Detection stage in multi-camera mode: the first camera's detections plus the fused score state."""
+        observation = self.cameras.latest_observation(0)
+        if observation is None:
+            return None
+        self.stream_lag.observe(time.time() - packet.timestamp)
+        table_vertices = observation["table_vertices"]
+        geometry = self.geometry.update(table_vertices, observation["geometry_version"], packet.frame.shape)
+        results = packet.results
+        results["table_vertices"] = table_vertices
+        results["ball_center"] = observation["ball"]
+        results["ball_radius"] = observation["ball_radius"]
+        if table_vertices is not None:
+            results["outlines"] = (geometry.green_outline, geometry.purple_outline)
+        fused = self.cameras.fused
+        if fused is not None and fused["cameras"] and fused["side"] is not None:
+            results["side"] = fused["side"]
+            results["zone"] = fused["zone"]
+            results["ball_cm"] = fused["ball_cm"]
+        self._publish_transitions(results["ball_center"], results.get("side"), results.get("ball_cm"))
+        self._update_trajectory(observation["timestamp"], results, packet.frame.shape)
+        if self.cameras.score_keeper.undetected_elapsed is not None:
+            results["undetected_elapsed"] = self.cameras.score_keeper.undetected_elapsed
+        return packet
+
+    def _account_cpu(self):
+        """Adds the process CPU time since the last detect stage to the active or idle total."""
+        now, cpu = time.perf_counter(), time.process_time()
+        if self._cpu_sample is not None:
+            wall_seconds, cpu_seconds = now - self._cpu_sample[0], cpu - self._cpu_sample[1]
+            idle = self.motion_gate is not None and self.motion_gate.idle
+            self.cpu_seconds.inc(cpu_seconds, "idle" if idle else "active")
+            if wall_seconds > 0:
+                self._cpu_usage += 0.1 * (cpu_seconds / wall_seconds - self._cpu_usage)
+                self.cpu_usage.set(self._cpu_usage)
+        self._cpu_sample = (now, cpu)
+
+    def _detect_stage(self, packet):
+        """Detection stage: finds the table and ball and updates the scoring state."""
+        frame = packet.frame
+        results = packet.results
+        self._account_cpu()
+        if self.motion_gate is not None:
+            start = time.perf_counter()
+            admitted = self.motion_gate.admit(frame, packet.timestamp)
+            self.stage_seconds.observe(time.perf_counter() - start, "motion")
+            if not admitted:
+                # Nothing moved: the scores and the live feed's last frame still hold.
+                self.frames_gated.inc()
+                return None
+        self.stream_lag.observe(time.time() - packet.timestamp)
+        detected = self.core.process(frame)
+        if detected is None:
+            self.detection_timeouts.inc()
+            return None
+        results.update(detected)
+        start = time.perf_counter()
+
+        # --- SCORING --- #
+        ball_center = results["ball_center"]
+        side_text = results.get("side")
+        self._publish_transitions(ball_center, side_text, results.get("ball_cm"))
+        kind = self._update_trajectory(packet.timestamp, results, frame.shape)
+        # Frame capture time, so calls do not depend on how fast frames are processed.
+        winner = self.judge.update(packet.timestamp, results, self.trajectory, kind, frame.shape)
+        if self.judge.undetected_elapsed is not None:
+            results["undetected_elapsed"] = self.judge.undetected_elapsed
+        if winner is not None:
+            call = self.judge.last_call
+            self.trigger_score_event(winner, reason=call["reason"], confidence=call["confidence"])
+        self.stage_seconds.observe(time.perf_counter() - start, "scoring")
+        for step, seconds in self.core.timings.items():
+            self.stage_seconds.observe(seconds, step)
+        return packet
+
+    def _annotate_stage(self, packet):
+        """Annotation stage: draws the detection results onto the captured frame."""
+        # Nobody is watching: skip drawing and encoding entirely.
+        if not any(broadcaster.viewers for broadcaster in self.frames.values()):
+            return None
+        start = time.perf_counter()
+        annotate(packet.frame, packet.results)
+        self.stage_seconds.observe(time.perf_counter() - start, "annotate")
+        return packet
+
+    def _tiers_due(self, timestamp):
+        """Tiers with viewers whose frame-rate cap allows a frame captured at timestamp."""
+        due = []
+        with self._tier_lock:
+            for tier, (_, _, max_fps) in VIDEO_TIERS.items():
+                if not self.frames[tier].viewers or timestamp < self._tier_due[tier]:
+                    continue
+                if max_fps:
+                    self._tier_due[tier] = timestamp + 1.0 / max_fps
+                due.append(tier)
+        return due
+
+    def _encode_stage(self, packet):
+        """Encode stage: JPEG-encodes the annotated frame once for every watched tier and publishes it."""
+        start = time.perf_counter()
+        published = False
+        for tier in self._tiers_due(packet.timestamp):
+            scale, quality, _ = VIDEO_TIERS[tier]
+            frame = packet.frame
+            if scale != 1.0:
+                frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            ret, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
             if not ret:
                 continue
-
-            frame_adjusted = self.adjust_lighting(frame)
-            table_vertices = self.detector.process_frame(frame_adjusted, self.adjust_lighting)
-            ball_center, ball_radius = self.detect_orange_ball(frame_adjusted)
-            padded_bounds = None
-
-            # Draw table boundaries if detected.
-            if table_vertices is not None:
-                pts = np.array(table_vertices, dtype="int32")
-                xs = pts[:, 0]
-                ys = pts[:, 1]
-                min_x, max_x = xs.min(), xs.max()
-                min_y, max_y = ys.min(), ys.max()
-
-                # Draw green table rectangle with 1 cm padding.
-                green_min_x = max(min_x - self.green_padding_pixels, 0)
-                green_min_y = max(min_y - self.green_padding_pixels, 0)
-                green_max_x = min(max_x + self.green_padding_pixels, frame.shape[1])
-                green_max_y = min(max_y + self.green_padding_pixels, frame.shape[0])
-                cv2.rectangle(frame, (green_min_x, green_min_y), (green_max_x, green_max_y), (0, 255, 0), 3)
-
-                # Compute and draw purple padded rectangle with 5 cm padding.
-                padded_min_x = max(min_x - self.purple_padding_pixels, 0)
-                padded_min_y = max(min_y - self.purple_padding_pixels, 0)
-                padded_max_x = min(max_x + self.purple_padding_pixels, frame.shape[1])
-                padded_max_y = min(max_y + self.purple_padding_pixels, frame.shape[0])
-                padded_bounds = (padded_min_x, padded_min_y, padded_max_x, padded_max_y)
-                cv2.rectangle(frame, (padded_min_x, padded_min_y), (padded_max_x, padded_max_y), (128, 0, 128), 2)
-
-                # Draw table vertices.
-                for vertex in table_vertices:
-                    cv2.circle(frame, tuple(vertex), 5, (0, 0, 255), -1)
-
-            # --- BALL DETECTION & SCORING --- #
-            if ball_center is not None:
-                self.undetectable_start_time = None  # Reset timer.
-                cv2.circle(frame, ball_center, ball_radius, (0, 165, 255), 2)
-                if table_vertices is not None and padded_bounds is not None:
-                    side_text = self.determine_ball_side(ball_center, table_vertices)
-                    cv2.putText(frame, f"Side: {side_text}", (50, 90),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-                    self.ball_in_bounds = True
-                    self.last_detected_side = side_text
-                    cv2.putText(frame, "Ball Detected", (50, 50),
-                                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            else:
-                if self.ball_in_bounds and self.last_detected_side is not None:
-                    if self.undetectable_start_time is None:
-                        self.undetectable_start_time = time.time()
-                    else:
-                        elapsed = time.time() - self.undetectable_start_time
-                        cv2.putText(frame, f"Undetected: {elapsed:.1f}s", (50, 130),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-                        if elapsed >= DELAY_SECONDS:
-                            if self.last_detected_side == "Left":
-                                self.trigger_score_event("B")
-                            else:
-                                self.trigger_score_event("A")
-                            self.ball_in_bounds = False
-                            self.last_detected_side = None
-                            self.undetectable_start_time = None
-                else:
-                    self.undetectable_start_time = None
-
-            # Encode frame as JPEG.
-            ret2, jpeg = cv2.imencode('.jpg', frame)
-            if ret2:
-                self.latest_frame = jpeg.tobytes()
+            self.frames_encoded.inc(1, tier)
+            # Encoders can finish out of order; the broadcaster ignores older frames.
+            published |= self.frames[tier].publish(packet.seq, jpeg.tobytes())
+        if published:
+            self.stage_seconds.observe(time.perf_counter() - start, "encode")
+            self.end_to_end_seconds.observe(time.time() - packet.timestamp)
+        return None
 
     # --- PUBLIC METHODS --- #
-    def get_live_footage(self):
+    def add_viewer(self, tier):
+        """Registers a live feed viewer of tier; frames are only encoded for watched tiers."""
+        self.frames[tier].add_viewer()
+        self.viewers.inc()
+
+    def remove_viewer(self, tier):
+        self.frames[tier].remove_viewer()
+        self.viewers.dec()
+
+    def get_live_footage(self, tier=DEFAULT_VIDEO_TIER):
         """
-        Returns the latest processed frame (JPEG bytes).
+        Returns the latest processed frame of tier (JPEG bytes), or None if nobody watches it.
         """
-        return self.latest_frame
+        return self.frames[tier].latest()[1]
 
     def get_score_event(self):
         """
@@ -263,32 +437,304 @@ class GameTracker:
         return event
 
 # --- FLASK APP SETUP --- #
-from flask import Flask, Response, jsonify
 
 app = Flask(__name__)
-game_tracker = GameTracker()  # Instantiate our game tracker.
 
-def generate_frames():
-    """Generator that yields MJPEG frames from the game tracker."""
-    while True:
-        frame = game_tracker.get_live_footage()
-        if frame is None:
-            continue
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+trackers = {}        # Table id -> GameTracker, in TABLES order; filled by start_tables().
+game_tracker = None  # The first table's tracker, also served on the unprefixed routes.
+detection_pool = None
+_tracker_lock = threading.Lock()
+
+def table_files(table_id, first):
+    """
+    Journal path and replay directory of a table; the first table keeps the
+    single-table paths and the others get siblings of them (replays-<id>/),
+    so no table's replays end up inside another's directory.
+    """
+    if first:
+        return JOURNAL_PATH, REPLAY_DIR
+    root, ext = os.path.splitext(JOURNAL_PATH)
+    return f"{root}-{table_id}{ext}", f"{REPLAY_DIR}-{table_id}"
+
+def start_tables(tables=None, pool_workers=POOL_WORKERS):
+    """
+    Creates and starts the tracker of every table (TABLES by default), once.
+    Single-camera tables share a detection pool when there are several of
+    them; multi-camera tables keep their own camera processes.
+    """
+    global game_tracker, detection_pool
+    with _tracker_lock:
+        if trackers:
+            return trackers
+        tables = {str(table_id): sources for table_id, sources in (tables or TABLES).items()}
+        pooled = [table_id for table_id, sources in tables.items() if len(sources) == 1]
+        if len(pooled) > 1:
+            detection_pool = DetectionPool(min(pool_workers or default_workers(), len(pooled))).start()
+            atexit.register(detection_pool.stop)
+        started = {}
+        for index, (table_id, sources) in enumerate(tables.items()):
+            core = None
+            if detection_pool is not None and table_id in pooled:
+                core = detection_pool.add_table(table_id, ball_tracking=BALL_TRACKING, table_lock=TABLE_LOCK,
+                                                coarse=COARSE_TO_FINE, green_padding_cm=GREEN_PADDING_CM,
+                                                purple_padding_cm=PURPLE_PADDING_CM)
+            journal_path, replay_dir = table_files(table_id, index == 0)
+            # The paddles configured in PADDLE_URLS play on the first table.
+            started[table_id] = GameTracker(sources, table_id, core, PADDLE_URLS if index == 0 else None,
+                                            journal_path, replay_dir).start()
+        trackers.update(started)
+        game_tracker = next(iter(trackers.values()))
+        return trackers
+
+def find_tracker(table_id=None):
+    """Returns the tracker of table_id (the first table if None), or None for an unknown table."""
+    if not trackers:
+        start_tables()
+    if table_id is None:
+        return game_tracker
+    return trackers.get(table_id)
+
+def get_tracker(table_id=None):
+    """
+    Returns the tracker of table_id, starting every table on first use, so
+    importing this module (tests, tooling, camera processes) opens no camera.
+    Unknown tables answer 404.
+    """
+    tracker = find_tracker(table_id)
+    if tracker is None:
+        abort(make_response(jsonify({"error": f"unknown table {table_id!r}", "tables": list(trackers)}), 404))
+    return tracker
+
+def generate_frames(tracker, tier):
+    """
+    Generator that yields MJPEG frames of tier from a game tracker.
+    Blocks until a new frame exists; slow viewers skip to the newest frame.
+    """
+    seq = -1
+    tracker.add_viewer(tier)
+    try:
+        while True:
+            seq, frame = tracker.frames[tier].wait_for(seq, timeout=1.0)
+            if frame is None:
+                continue
+            yield mjpeg_part(frame)
+    finally:
+        tracker.remove_viewer(tier)
+
+@app.route('/tables')
+def tables():
+    """Endpoint listing the hosted tables with their sources and match state."""
+    find_tracker()  # Starts the tables on first use.
+    listing = [{"id": table_id, "sources": [str(source) for source in tracker.sources],
+                "url": f"/tables/{table_id}", "match": tracker.match.to_dict()}
+               for table_id, tracker in trackers.items()]
+    response = jsonify({"tables": listing})
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
 
 @app.route('/video_feed')
-def video_feed():
-    """Endpoint for streaming live annotated video."""
-    return Response(generate_frames(),
+@app.route('/tables/<table_id>/video_feed')
+def video_feed(table_id=None):
+    """Endpoint for streaming live annotated video (?tier=full|half|thumb)."""
+    tracker = get_tracker(table_id)
+    tier = request.args.get('tier', DEFAULT_VIDEO_TIER)
+    if tier not in VIDEO_TIERS:
+        return jsonify({"error": f"unknown tier {tier!r}", "tiers": list(VIDEO_TIERS)}), 400
+    return Response(generate_frames(tracker, tier),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/score_event')
-def score_event():
+@app.route('/tables/<table_id>/score_event')
+def score_event(table_id=None):
     """Endpoint to get the latest score event as JSON."""
-    event = game_tracker.get_score_event()
+    event = get_tracker(table_id).get_score_event()
     return jsonify({"score_event": event})
 
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Access-Control-Allow-Origin": "*",
+}
 
+def generate_events(stream, last_id):
+    """Generator that yields every event of stream after last_id as Server-Sent Events."""
+    while True:
+        events = stream.wait_for(last_id, timeout=SSE_KEEPALIVE_SECONDS)
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        for event in events:
+            yield sse_message(event)
+        last_id = events[-1]["id"]
+
+@app.route('/events/history')
+@app.route('/tables/<table_id>/events/history')
+def events_history(table_id=None):
+    """
+    Endpoint paging through the journalled events after ?since=<id> (or from ?from_time=<unix time>).
+    Keep passing next_since back while more is true to read the whole match.
+    """
+    journal = get_tracker(table_id).journal
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+        from_time = request.args.get('from_time')
+        if from_time is not None:
+            since = max(since, journal.id_at_time(float(from_time)))
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers, from_time a number"}), 400
+    events, more = journal.read(since, limit)
+    next_since = events[-1]["id"] if events else since
+    response = jsonify({"events": events, "next_since": next_since, "more": more})
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/trajectory')
+@app.route('/tables/<table_id>/trajectory')
+def trajectory(table_id=None):
+    """
+    Endpoint to get the ball speed and rally analytics (bounces, duration, peak speed),
+    plus the last ?points=<n> positions as [time, x, y, table_x_cm, table_y_cm] rows.
+    """
+    analytics = get_tracker(table_id).trajectory
+    try:
+        points = int(request.args.get('points', 0))
+    except ValueError:
+        return jsonify({"error": "points must be an integer"}), 400
+    body = analytics.summary()
+    if points > 0:
+        rows = analytics.recent(points)
+        body["points"] = [[None if v != v else v for v in row] for row in rows.tolist()]
+    response = jsonify(body)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/replays')
+@app.route('/tables/<table_id>/replays')
+def replays(table_id=None):
+    """Endpoint listing the exported replay clips, oldest first; each is served from its url."""
+    tracker = get_tracker(table_id)
+    clips = [dict(clip, url=f"{request.path}/{clip['file']}") for clip in tracker.clips.clips]
+    response = jsonify({"clips": clips, "buffer_seconds": tracker.replay.duration})
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/replays/<path:filename>')
+@app.route('/tables/<table_id>/replays/<path:filename>')
+def replay_clip(filename, table_id=None):
+    """Endpoint serving one replay clip."""
+    response = send_from_directory(get_tracker(table_id).clips.directory, filename, conditional=True)
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/match')
+@app.route('/tables/<table_id>/match')
+def match(table_id=None):
+    """Endpoint to get the current match state (score, last ball side), rebuilt from the journal on startup."""
+    response = jsonify(get_tracker(table_id).match.to_dict())
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/match/reset', methods=['POST'])
+@app.route('/tables/<table_id>/match/reset', methods=['POST'])
+def match_reset(table_id=None):
+    """Endpoint to start a new match; the reset is journalled like any other event."""
+    tracker = get_tracker(table_id)
+    tracker.publish_event("reset")
+    return jsonify(tracker.match.to_dict())
+
+@app.route('/metrics')
+@app.route('/tables/<table_id>/metrics')
+def metrics(table_id=None):
+    """Endpoint exposing pipeline metrics in the Prometheus text format."""
+    registry = get_tracker(table_id).metrics
+    if not registry.enabled:
+        return Response("metrics disabled\n", status=404, mimetype='text/plain')
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/table/recalibrate', methods=['POST'])
+@app.route('/tables/<table_id>/table/recalibrate', methods=['POST'])
+def table_recalibrate(table_id=None):
+    """Endpoint to release the table lock, e.g. after the camera or table was moved."""
+    core = get_tracker(table_id).core
+    core.unlock()
+    return jsonify({"locked": core.locked})
+
+@app.route('/paddles/<paddle_id>/samples', methods=['POST'])
+@app.route('/tables/<table_id>/paddles/<paddle_id>/samples', methods=['POST'])
+def paddle_samples(paddle_id, table_id=None):
+    """Endpoint for paddles to push a batch of samples (see SensorHub.ingest)."""
+    sensor_hub = get_tracker(table_id).sensor_hub
+    batch = request.get_json(silent=True)
+    if not isinstance(batch, dict) or "t" not in batch:
+        return jsonify({"error": "expected a JSON object of sample columns"}), 400
+    try:
+        hits = sensor_hub.ingest(paddle_id, batch)
+    except (ValueError, TypeError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"hits": len(hits)})
+
+@app.route('/paddles')
+@app.route('/tables/<table_id>/paddles')
+def paddles(table_id=None):
+    """Endpoint to get the latest reading and hit count of every paddle."""
+    response = jsonify({"paddles": get_tracker(table_id).sensor_hub.state()})
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+@app.route('/events')
+@app.route('/tables/<table_id>/events')
+def events(table_id=None):
+    """
+    Endpoint streaming every score, hit and swing event to each subscriber (Server-Sent Events).
+    New subscribers get live events only; Last-Event-ID or ?last_id=<id> resumes after that id.
+    """
+    stream = get_tracker(table_id).events
+    last_id = parse_event_id(request.headers.get('Last-Event-ID'), request.args.get('last_id'))
+    if last_id is None:
+        # A new subscriber only gets live events; the past is on /events/history.
+        last_id = stream.last_id
+    return Response(generate_events(stream, last_id),
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
+# --- MAIN FUNCTION --- #
+def parse_table(spec):
+    """Parses a --table ID=SRC[,SRC...] argument into (table id, sources)."""
+    table_id, sep, sources = spec.partition("=")
+    if not sep or not table_id or not sources:
+        raise argparse.ArgumentTypeError(f"expected ID=SOURCE[,SOURCE...], got {spec!r}")
+    return table_id, sources.split(",")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the PrimePong backend server.")
+    parser.add_argument("--source", action="append",
+                        help="Camera index, stream URL, video file or synthetic spec; repeat for "
+                             f"multi-camera mode (default: {CAMERA_SOURCES}).")
+    parser.add_argument("--table", action="append", type=parse_table, metavar="ID=SOURCE[,SOURCE...]",
+                        help="Host a table with these camera sources on /tables/<id>/...; repeat for "
+                             "more tables. The first is also served on the unprefixed routes.")
+    parser.add_argument("--pool-workers", type=int, default=POOL_WORKERS,
+                        help="Detection processes shared by the tables (default: one per core, less one).")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--asgi", action="store_true",
+                        help="Serve with uvicorn; one event loop serves every /video_feed viewer.")
+    args = parser.parse_args(argv)
+    if args.table:
+        tables = dict(args.table)
+    elif args.source:
+        tables = {next(iter(TABLES)): args.source}
+    else:
+        tables = TABLES
+
+    # Open the cameras now, so a missing camera is reported before serving.
+    start_tables(tables, args.pool_workers)
+    if args.asgi:
+        import uvicorn
+        from asgi_server import create_asgi_app
+        uvicorn.run(create_asgi_app(app, find_tracker, VIDEO_TIERS, DEFAULT_VIDEO_TIER),
+                    host=args.host, port=args.port, lifespan='off')
+    else:
+        app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Frame sources: everything the trackers can read frames from.
+
+A source is a camera index (2 or "2"), a stream URL (e.g. iVCam's
+"http://100.66.66.65:139/video"), a video file, or "<scheme>?<options>" for a
+registered scheme, such as the built-in synthetic scene
+("synthetic?size=640x360&perspective=0.3&occlude=left&seed=1"). Opening a
+source returns a VideoCapture-like object (isOpened, read, release);
+register_source adds new schemes.
+"""
+import os
+import time
+from urllib.parse import parse_qsl
+
+import cv2
+
+# --- CONFIGURATION --- #
+STREAM_OPEN_TIMEOUT_MS = 5000   # Give up connecting to a stream URL after this long.
+STREAM_READ_TIMEOUT_MS = 3000   # A stream read that stalls this long fails instead of hanging.
+SYNTHETIC_SIZE = (1280, 720)
+SYNTHETIC_FPS = 60
+SYNTHETIC_OCCLUDERS = {       # Player boxes for synthetic sources, as frame fractions.
+    "left": (0.0, 0.28, 0.45, 0.74),
+    "right": (0.55, 0.28, 1.0, 0.74),
+}
+
+# --- SYNTHETIC SOURCE --- #
+class SyntheticCapture:
+    """VideoCapture-like synthetic scene played in real time from a shared start time."""
+
+    def __init__(self, options, start_at):
+        from synthetic_scene import SyntheticScene
+        width, height = SYNTHETIC_SIZE
+        if "size" in options:
+            width, height = (int(v) for v in options["size"].lower().split("x"))
+        self.scene = SyntheticScene(width, height, fps=int(options.get("fps", SYNTHETIC_FPS)),
+                                    points=int(options.get("points", 3)),
+                                    perspective=float(options.get("perspective", 0.0)),
+                                    occluder=SYNTHETIC_OCCLUDERS.get(options.get("occlude")),
+                                    seed=int(options.get("seed", 0)))
+        self.start_at = start_at
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self, image=None):
+        if self.index >= self.scene.frame_count:
+            return False, None
+        frame_time = self.start_at + self.index / self.scene.fps
+        delay = frame_time - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self.scene.render(self.index)
+        self.index += 1
+        if image is not None:
+            image[...] = frame
+            frame = image
+        return True, frame
+
+    def timestamp(self):
+        return self.start_at + (self.index - 1) / self.scene.fps
+
+    def release(self):
+        pass
+
+# --- VIDEO FILE SOURCE --- #
+class VideoFileCapture:
+    """Video file read as fast as it decodes; frame timestamps come from the file's own clock."""
+
+    def __init__(self, path, start_at):
+        self.cap = cv2.VideoCapture(path)
+        self.start_at = start_at
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self, image=None):
+        if image is None:
+            return self.cap.read()
+        return self.cap.read(image)
+
+    def timestamp(self):
+        return self.start_at + self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+    def release(self):
+        self.cap.release()
+
+# --- SOURCE REGISTRY --- #
+# Scheme -> factory(options, start_at) returning a VideoCapture-like object.
+SOURCE_SCHEMES = {"synthetic": SyntheticCapture}
+
+def register_source(scheme, factory):
+    """Makes "<scheme>?<options>" sources open with factory(options dict, start_at)."""
+    SOURCE_SCHEMES[scheme] = factory
+
+def open_source(source, start_at=None):
+    """Opens a camera index, stream URL, video file or registered scheme; start_at is the time of the first frame of synthetic and file sources."""
+    start_at = time.time() if start_at is None else start_at
+    if isinstance(source, str):
+        scheme, _, query = source.partition("?")
+        if scheme in SOURCE_SCHEMES:
+            return SOURCE_SCHEMES[scheme](dict(parse_qsl(query)), start_at)
+        if source.isdigit():
+            source = int(source)
+        elif os.path.isfile(source):
+            return VideoFileCapture(source, start_at)
+        elif "://" in source:
+            # Without timeouts a dropped stream blocks read() instead of failing.
+            return cv2.VideoCapture(source, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, STREAM_OPEN_TIMEOUT_MS,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, STREAM_READ_TIMEOUT_MS,
+            ])
+    return cv2.VideoCapture(source)
+
+def is_live(source):
+    """True for camera indices and stream URLs: sources that can drop out and be reconnected."""
+    if not isinstance(source, str):
+        return True
+    return source.isdigit() or "://" in source
+
+def frame_timestamp(cap):
+    """Capture time of the frame just read: the source's own clock if it has one, else now."""
+    timestamp = getattr(cap, "timestamp", None)
+    return timestamp() if timestamp is not None else time.time()
@@ -0,0 +1,211 @@
+"""
+Synthetic table-tennis scenes with ground truth, for benchmarks and accuracy checks.
+
+Renders a table with the four blue corner markers and an orange ball on a
+scripted rally trajectory, with sensor noise and lighting variation, and
+reports for every frame where the ball really is and which points were won.
+"""
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+BACKGROUND_BGR = (45, 70, 60)      # Floor.
+TABLE_BGR = (225, 225, 225)        # White paper on the table.
+MARKER_BGR = (200, 60, 20)         # Blue corner stickers.
+BALL_BGR = (0, 120, 255)           # Orange ball.
+OCCLUDER_BGR = (60, 40, 90)        # Player standing between the camera and the ball.
+STROKE_SECONDS = 0.6               # Time for one crossing of the table.
+POINT_PAUSE_SECONDS = 4.5          # Ball out of view between points.
+NOISE_FIELDS = 4                   # Precomputed sensor-noise fields, cycled per frame.
+BOUNCE_HEIGHT = 0.15               # Peak ball height, as a fraction of the table's image height.
+RETURN_DEPTH_MAX = 0.2             # Furthest behind the end a ball is returned from, in table lengths.
+
+# --- TRAJECTORY SCRIPT --- #
+def rally_script(points=3, strokes_per_point=4, seed=0):
+    """
+    Builds a list of scripted points.
+
+    Each point is a rally of `strokes_per_point` crossings that starts from a
+    random end. Returned strokes are played from up to RETURN_DEPTH_MAX table
+    lengths behind the receiver's end line, as players do, so the ball is
+    beyond the table moving away before every return. The last stroke is not
+    returned, so the ball bounces on the receiver's half, flies off that end
+    of the table and leaves the frame.
+    """
+    rng = np.random.default_rng(seed)
+    script = []
+    for _ in range(points):
+        start_left = bool(rng.integers(2))
+        lanes = rng.uniform(0.2, 0.8, size=strokes_per_point + 1)
+        depths = rng.uniform(0.0, RETURN_DEPTH_MAX, size=strokes_per_point)
+        script.append({"start_left": start_left, "lanes": lanes, "depths": depths})
+    return script
+
+class SyntheticScene:
+    """
+    Frame generator for a scripted match.
+
+    Table coordinates are (u, v) in [0, 1]: u runs along the table from the
+    Left end to the Right end, v across it. The table quad is projected into
+    the image with an optional perspective tilt, and ball height is drawn as
+    an upward image offset so bounces are visible as vertical velocity flips.
+    """
+
+    def __init__(self, width=1280, height=720, fps=60, points=3, strokes_per_point=4,
+                 noise_sigma=4.0, lighting_variation=0.25, perspective=0.0, occluder=None, seed=0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.noise_sigma = noise_sigma
+        self.lighting_variation = lighting_variation
+        # Optional (x0, y0, x1, y1) box, as fractions of the frame, drawn over the ball.
+        self.occluder = None
+        if occluder is not None:
+            x0, y0, x1, y1 = occluder
+            self.occluder = (int(x0 * width), int(y0 * height), int(x1 * width), int(y1 * height))
+        self.rng = np.random.default_rng(seed)
+
+        # Table quad in the image: top-left, top-right, bottom-right, bottom-left.
+        inset = perspective * 0.1 * width
+        self.corners = np.array([
+            [0.16 * width + inset, 0.22 * height],
+            [0.84 * width - inset, 0.22 * height],
+            [0.84 * width, 0.80 * height],
+            [0.16 * width, 0.80 * height],
+        ], dtype="float32")
+        unit = np.array([[0, 0], [1, 0], [1, 1], [0, 1]], dtype="float32")
+        self.homography = cv2.getPerspectiveTransform(unit, self.corners)
+        self.table_height_px = float(self.corners[3, 1] - self.corners[0, 1])
+
+        self.ball_radius = max(int(round(0.008 * width)), 3)
+        self.marker_radius = max(int(round(0.01 * width)), 4)
+
+        self.events = []                 # Ground-truth score events: {"frame", "time", "winner"}.
+        self._timeline = self._build_timeline(rally_script(points, strokes_per_point, seed))
+        self.frame_count = len(self._timeline)
+        self._base = self._render_static()
+        self._noise = [self.rng.normal(0.0, noise_sigma, size=self._base.shape).astype(np.int16)
+                       for _ in range(NOISE_FIELDS)] if noise_sigma else []
+
+    # --- TRAJECTORY --- #
+    def _build_timeline(self, script):
+        """Per-frame ground truth (u, v, h) of the ball, or None while it is out of view."""
+        dt = 1.0 / self.fps
+        stroke_frames = int(round(STROKE_SECONDS * self.fps))
+        pause_frames = int(round(POINT_PAUSE_SECONDS * self.fps))
+        timeline = [None] * pause_frames
+        for point in script:
+            from_left = point["start_left"]
+            lanes = point["lanes"]
+            u1 = 0.0 if from_left else 1.0   # The serve is played from the end line.
+            for stroke, (v0, v1) in enumerate(zip(lanes[:-1], lanes[1:])):
+                last = stroke == len(lanes) - 2
+                u0 = u1
+                if last:
+                    # Unreturned: keep flying past the far end until out of frame.
+                    u1 = 2.2 if from_left else -1.2
+                else:
+                    # Returned from behind the far end line.
+                    depth = point["depths"][stroke]
+                    u1 = 1.0 + depth if from_left else -depth
+                bounce_u = 0.75 if from_left else 0.25
+                for i in range(stroke_frames):
+                    s = i / stroke_frames
+                    u = u0 + (u1 - u0) * s
+                    v = v0 + (v1 - v0) * s
+                    h = self._height(u, u0, bounce_u, u1)
+                    timeline.append((u, v, h))
+                from_left = not from_left
+            # The last stroke was hit from the end opposite from_left; its
+            # receiver missed, so the hitter wins the point.
+            hitter_left = not from_left
+            # Frames where the ball has already left the image are out of view.
+            timeline_end = len(timeline)
+            while not self._in_view(*timeline[timeline_end - 1]):
+                timeline_end -= 1
+                timeline[timeline_end] = None
+            self.events.append({"frame": timeline_end, "time": timeline_end * dt,
+                                "winner": "A" if hitter_left else "B"})
+            timeline.extend([None] * pause_frames)
+        return timeline
+
+    @staticmethod
+    def _height(u, u0, bounce_u, u1):
+        """
+        Ball height along a stroke: a falling arc from paddle height to the
+        bounce, then a rising arc that peaks at the far end of the table and
+        falls behind it (towards the floor if nobody returns the ball).
+        """
+        if abs(u - u0) < abs(bounce_u - u0):
+            s = (u - u0) / (bounce_u - u0)
+            return BOUNCE_HEIGHT * (1 - s) + 2.4 * BOUNCE_HEIGHT * s * (1 - s)
+        end = 1.0 if bounce_u > u0 else 0.0   # Far end of the table.
+        s = (u - bounce_u) / (end - bounce_u)
+        return BOUNCE_HEIGHT * s * (2 - s)
+
+    def _project(self, u, v, h):
+        pt = cv2.perspectiveTransform(np.array([[[u, v]]], dtype="float32"), self.homography)[0, 0]
+        return float(pt[0]), float(pt[1] - h * self.table_height_px)
+
+    def _in_view(self, u, v, h):
+        x, y = self._project(u, v, h)
+        r = self.ball_radius
+        return -r < x < self.width + r and -r < y < self.height + r
+
+    # --- RENDERING --- #
+    def _render_static(self):
+        frame = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        frame[:] = BACKGROUND_BGR
+        cv2.fillConvexPoly(frame, self.corners.astype("int32"), TABLE_BGR)
+        for x, y in self.corners:
+            cv2.circle(frame, (int(round(x)), int(round(y))), self.marker_radius, MARKER_BGR, -1)
+        return frame
+
+    def truth(self, index):
+        """
+        Ground truth for frame index: ball center/radius (or None), side, table
+        corners, and whether the ball is visible (not behind the occluder).
+        """
+        state = self._timeline[index]
+        ball, side, visible = None, None, False
+        if state is not None:
+            x, y = self._project(*state)
+            ball = (x, y)
+            side = "Left" if state[0] < 0.5 else "Right"
+            visible = self.occluder is None or not (
+                self.occluder[0] <= x <= self.occluder[2] and self.occluder[1] <= y <= self.occluder[3])
+        return {
+            "time": index / self.fps,
+            "ball": ball,
+            "ball_radius": self.ball_radius if ball is not None else None,
+            "side": side,
+            "visible": visible,
+            "corners": self.corners,
+        }
+
+    def render(self, index):
+        """Renders frame index (BGR uint8) with noise and lighting variation."""
+        frame = self._base.copy()
+        truth = self.truth(index)
+        if truth["ball"] is not None:
+            x, y = truth["ball"]
+            cv2.circle(frame, (int(round(x)), int(round(y))), self.ball_radius, BALL_BGR, -1)
+        if self.occluder is not None:
+            x0, y0, x1, y1 = self.occluder
+            cv2.rectangle(frame, (x0, y0), (x1, y1), OCCLUDER_BGR, -1)
+
+        # Slow global lighting drift plus a fixed left-to-right gradient.
+        gain = 1.0 + self.lighting_variation * np.sin(2 * np.pi * index / (self.fps * 7.0))
+        frame = cv2.convertScaleAbs(frame, alpha=gain * 0.9, beta=0)
+        if self.lighting_variation:
+            gradient = np.linspace(1.0 - self.lighting_variation / 2, 1.0, self.width, dtype="float32")
+            frame = (frame * gradient[None, :, None]).astype(np.uint8)
+        if self._noise:
+            noise = self._noise[index % len(self._noise)]
+            frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        return frame
+
+    def frames(self):
+        """Yields (index, timestamp, frame) for the whole script."""
+        for index in range(self.frame_count):
+            yield index, index / self.fps, self.render(index)
@@ -0,0 +1,222 @@
+import cv2
+import numpy as np
+
+from color_classifier import MARKER
+from segmentation import find_blobs, resolution_scale
+
+# --- CONFIGURATION --- #
+# Pixel values are at segmentation.REFERENCE_WIDTH and scale with the frame.
+MIN_DISTANCE_PIXELS = 50     # Adjust based on your calibration
+MIN_MARKER_AREA = 50         # Smallest blue blob (pixels) accepted as a marker.
+MATCH_THRESHOLD_PIXELS = 50  # Max distance between a tracked and a detected marker.
+SMOOTHING_ALPHA = 0.3        # Weight of a new detection in the tracked position.
+
+# Table lock: once the four markers have been stable for LOCK_STABLE_FRAMES frames,
+# the geometry is frozen and full marker detection only runs every
+# VERIFY_EVERY_FRAMES frames or when the per-frame drift check fires.
+LOCK_STABLE_FRAMES = 30
+STABLE_PIXELS = 3.0          # Max per-frame marker movement that still counts as stable.
+VERIFY_EVERY_FRAMES = 300    # ~5 s at 60 fps.
+DRIFT_PIXELS = 8.0           # Marker centroid shift inside its patch that triggers re-verification.
+MAX_FAILED_VERIFICATIONS = 3 # Consecutive failed re-verifications before the lock is released.
+
+# --- TABLE DETECTOR CLASS --- #
+class TableDetector:
+    """
+    Finds the four blue corner markers and tracks the table vertices.
+
+    With `lock` enabled the detector calibrates first: after the four markers
+    are stable for `lock_frames` frames, it freezes the table geometry and
+    stops per-frame marker segmentation. While locked, each frame only runs a
+    cheap drift check on a small patch around every marker; full detection
+    re-verifies the lock every `verify_every` frames or when drift is seen.
+    Occlusions are tolerated: a hidden marker is skipped by the drift check,
+    and a verification that finds the other markers in place keeps the lock.
+    The lock is released, and calibration starts over from scratch, after
+    MAX_FAILED_VERIFICATIONS consecutive verifications that find no marker
+    where it was (the table or camera moved). With `coarse`,
+    markers are searched on the downscaled frame and refined at full size.
+    """
+
+    def __init__(self, lock=True, lock_frames=LOCK_STABLE_FRAMES, verify_every=VERIFY_EVERY_FRAMES, coarse=True):
+        self.tracked_markers = None
+        self.lock = lock
+        self.coarse = coarse
+        self.scale = 1.0              # resolution_scale of the last processed frame.
+        self.lock_frames = lock_frames
+        self.verify_every = verify_every
+        self.locked = False
+        self.geometry_version = 0     # Incremented whenever the published vertices change.
+        self._vertices = None         # Cached list of [x, y] for the tracked markers.
+        self._stable_frames = 0
+        self._frames_since_verify = 0
+        self._failed_verifications = 0
+
+    def order_points(self, pts):
+        """Order 4 points as top-left, top-right, bottom-right, bottom-left."""
+        rect = np.zeros((4, 2), dtype="float32")
+        s = pts.sum(axis=1)
+        rect[0] = pts[np.argmin(s)]
+        rect[2] = pts[np.argmax(s)]
+        diff = np.diff(pts, axis=1)
+        rect[1] = pts[np.argmin(diff)]
+        rect[3] = pts[np.argmax(diff)]
+        return rect
+
+    def remove_close_points(self, points, min_distance):
+        """Remove points that are too close to an earlier point."""
+        if len(points) == 0:
+            return points
+        dist = np.linalg.norm(points[:, None, :] - points[None, :, :], axis=2)
+        # Pairs (i, j) with j after i and closer than min_distance; drop j unless
+        # i itself was already dropped.
+        close = np.triu(dist < min_distance, k=1)
+        keep = np.ones(len(points), dtype=bool)
+        for i in np.flatnonzero(close.any(axis=1)):
+            if keep[i]:
+                keep &= ~close[i]
+        return points[keep].astype("float32")
+
+    def detect_blue_markers(self, ctx):
+        """Detect blue markers in the frame context and return centroids."""
+        contours = find_blobs(ctx, MARKER, MIN_MARKER_AREA, coarse=self.coarse)
+        min_area = MIN_MARKER_AREA * self.scale ** 2
+        centroids = []
+        for cnt in contours:
+            if cv2.contourArea(cnt) > min_area:
+                M = cv2.moments(cnt)
+                if M["m00"] != 0:
+                    cx = int(M["m10"] / M["m00"])
+                    cy = int(M["m01"] / M["m00"])
+                    centroids.append([cx, cy])
+        if len(centroids) == 0:
+            return None
+        centroids = np.array(centroids, dtype="float32")
+        centroids = self.remove_close_points(centroids, MIN_DISTANCE_PIXELS * self.scale)
+        return centroids
+
+    def match_markers(self, tracked, detected, threshold):
+        """
+        Pairs each tracked marker with its nearest unused detection.
+
+        Returns an array of detection indices per tracked marker (-1 if none is
+        within threshold). Pairs are taken greedily in order of distance from
+        one vectorized distance matrix.
+        """
+        match = np.full(len(tracked), -1)
+        if len(detected) == 0:
+            return match
+        dist = np.linalg.norm(tracked[:, None, :] - detected[None, :, :], axis=2)
+        used = np.zeros(len(detected), dtype=bool)
+        for flat in np.argsort(dist, axis=None):
+            i, j = divmod(int(flat), len(detected))
+            if dist[i, j] >= threshold:
+                break
+            if match[i] == -1 and not used[j]:
+                match[i] = j
+                used[j] = True
+        return match
+
+    def update_tracked_markers(self, tracked, detected, threshold=None, alpha=SMOOTHING_ALPHA):
+        """Update tracked marker positions smoothly."""
+        if threshold is None:
+            threshold = MATCH_THRESHOLD_PIXELS * self.scale
+        match = self.match_markers(tracked, detected, threshold)
+        found = match >= 0
+        updated = tracked.copy()
+        updated[found] = alpha * detected[match[found]] + (1 - alpha) * tracked[found]
+        return updated, found
+
+    # --- LOCK MODE --- #
+    def _drifted(self, ctx):
+        """
+        Cheap per-frame check that the locked markers are still where they were.
+        A marker missing from its patch is taken as occluded; only a visible
+        marker that shifted, or every marker missing, counts as drift.
+        """
+        h, w = ctx.shape[:2]
+        half = int(MIN_DISTANCE_PIXELS * self.scale) // 2
+        min_area = MIN_MARKER_AREA * self.scale ** 2
+        visible = 0
+        for x, y in self.tracked_markers:
+            x0, y0 = max(int(x) - half, 0), max(int(y) - half, 0)
+            x1, y1 = min(int(x) + half, w), min(int(y) + half, h)
+            if x1 <= x0 or y1 <= y0:
+                return True
+            mask = cv2.compare(ctx.labels_region((x0, y0, x1, y1)), MARKER, cv2.CMP_EQ)
+            M = cv2.moments(mask, binaryImage=True)
+            if M["m00"] < min_area:
+                continue
+            visible += 1
+            shift = np.hypot(x0 + M["m10"] / M["m00"] - x, y0 + M["m01"] / M["m00"] - y)
+            if shift > DRIFT_PIXELS * self.scale:
+                return True
+        return visible == 0
+
+    def _verify(self, ctx):
+        """
+        Full re-detection while locked; keeps the lock unless verification
+        keeps finding none of the markers where they were.
+        """
+        self._frames_since_verify = 0
+        detected = self.detect_blue_markers(ctx)
+        if detected is not None:
+            updated, found = self.update_tracked_markers(self.tracked_markers, detected)
+            if found.all():
+                self._failed_verifications = 0
+                self._set_markers(updated)
+                return
+            if found.any():
+                # Some markers are in place and the rest hidden: keep the lock as it is.
+                self._failed_verifications = 0
+                return
+        self._failed_verifications += 1
+        if self._failed_verifications >= MAX_FAILED_VERIFICATIONS:
+            self.unlock()
+
+    def unlock(self):
+        """Releases the table lock and restarts calibration from a fresh 4-marker detection."""
+        self.locked = False
+        self._stable_frames = 0
+        self._failed_verifications = 0
+        self.tracked_markers = None
+        if self._vertices is not None:
+            self._vertices = None
+            self.geometry_version += 1
+
+    def _set_markers(self, markers):
+        self.tracked_markers = markers
+        vertices = markers.astype(int).tolist()
+        if vertices != self._vertices:
+            self._vertices = vertices
+            self.geometry_version += 1
+
+    def process_frame(self, ctx):
+        """
+        Processes the frame context and, if 4 markers are detected,
+        returns the table's vertices as a list of 4 [x, y] pairs.
+        """
+        self.scale = resolution_scale(ctx.shape)
+        if self.locked:
+            self._frames_since_verify += 1
+            if self._frames_since_verify >= self.verify_every or self._drifted(ctx):
+                self._verify(ctx)
+            return self._vertices
+
+        detected = self.detect_blue_markers(ctx)
+        if detected is not None:
+            if self.tracked_markers is None:
+                if detected.shape[0] == 4:
+                    self._set_markers(self.order_points(detected))
+            else:
+                updated, found = self.update_tracked_markers(self.tracked_markers, detected)
+                movement = np.abs(updated - self.tracked_markers).max()
+                self._set_markers(updated)
+                if self.lock and found.all() and movement <= STABLE_PIXELS * self.scale:
+                    self._stable_frames += 1
+                    if self._stable_frames >= self.lock_frames:
+                        self.locked = True
+                        self._frames_since_verify = 0
+                else:
+                    self._stable_frames = 0
+        return self._vertices
@@ -0,0 +1,144 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION --- #
+TABLE_LENGTH_CM = 274.0    # Regulation table, measured between the Left and Right end markers.
+TABLE_WIDTH_CM = 152.5
+PURPLE_PADDING_CM = 5      # Purple padded rectangle: 5 cm padding.
+GREEN_PADDING_CM = 1       # Green table rectangle: 1 cm padding.
+
+# --- REGION LABELS --- #
+# A label is a zone in the low two bits plus the RIGHT bit for pixels on the
+# Right side of the net line (extended across the whole frame).
+OUT = 0
+PURPLE_MARGIN = 1
+GREEN_MARGIN = 2
+TABLE = 3
+ZONE_MASK = 3
+RIGHT = 4
+TABLE_LEFT = TABLE
+TABLE_RIGHT = TABLE | RIGHT
+
+ZONE_NAMES = {OUT: "out", PURPLE_MARGIN: "purple_margin", GREEN_MARGIN: "green_margin", TABLE: "table"}
+
+def _clip_half_plane(polygon, line):
+    """Clips a convex polygon to the half-plane a*x + b*y + c >= 0 (one Sutherland-Hodgman pass)."""
+    a, b, c = line
+    clipped = []
+    for i in range(len(polygon)):
+        p, q = polygon[i], polygon[(i + 1) % len(polygon)]
+        dp = a * p[0] + b * p[1] + c
+        dq = a * q[0] + b * q[1] + c
+        if dp >= 0:
+            clipped.append(p)
+        if (dp >= 0) != (dq >= 0):
+            t = dp / (dp - dq)
+            clipped.append((p[0] + t * (q[0] - p[0]), p[1] + t * (q[1] - p[1])))
+    return clipped
+
+# --- TABLE GEOMETRY CLASS --- #
+class TableGeometry:
+    """
+    Cached perspective model of the table.
+
+    From the four table vertices (top-left, top-right, bottom-right,
+    bottom-left, with the Left end first) it builds the image-to-table
+    homography and a per-pixel label map of the frame, so classifying the
+    ball is a single array lookup. Both are rebuilt only when the table
+    detector's geometry_version or the frame size changes.
+    """
+
+    def __init__(self, green_padding_cm=GREEN_PADDING_CM, purple_padding_cm=PURPLE_PADDING_CM):
+        self.green_padding_cm = green_padding_cm
+        self.purple_padding_cm = purple_padding_cm
+        self.labels = None           # uint8 label map (h, w), or None until the table is known.
+        self.homography = None       # Image pixels -> table centimetres.
+        self.green_outline = None    # int32 image polygons of the padded rectangles, for drawing.
+        self.purple_outline = None
+        self._key = None
+
+    def update(self, table_vertices, version, frame_shape):
+        """Rebuilds the homography and label map if the table or frame size changed."""
+        if table_vertices is None:
+            return self
+        key = (version, frame_shape[:2])
+        if key != self._key:
+            self._key = key
+            self._build(np.array(table_vertices, dtype="float32"), frame_shape[:2])
+        return self
+
+    def _table_to_image(self, points_cm):
+        pts = np.array(points_cm, dtype="float32").reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(pts, self._inverse).reshape(-1, 2)
+
+    def _padded_quad(self, padding_cm):
+        p = padding_cm
+        return self._table_to_image([[-p, -p], [TABLE_LENGTH_CM + p, -p],
+                                     [TABLE_LENGTH_CM + p, TABLE_WIDTH_CM + p], [-p, TABLE_WIDTH_CM + p]])
+
+    def _build(self, vertices, shape):
+        h, w = shape
+        table_cm = np.array([[0, 0], [TABLE_LENGTH_CM, 0], [TABLE_LENGTH_CM, TABLE_WIDTH_CM],
+                             [0, TABLE_WIDTH_CM]], dtype="float32")
+        self.homography = cv2.getPerspectiveTransform(vertices, table_cm)
+        self._inverse = np.linalg.inv(self.homography)
+
+        purple = self._padded_quad(self.purple_padding_cm)
+        green = self._padded_quad(self.green_padding_cm)
+        if self.labels is None or self.labels.shape != (h, w):
+            self.labels = np.empty((h, w), dtype=np.uint8)
+        labels = self.labels
+        labels[:] = OUT
+        cv2.fillConvexPoly(labels, np.round(purple).astype("int32"), PURPLE_MARGIN)
+        cv2.fillConvexPoly(labels, np.round(green).astype("int32"), GREEN_MARGIN)
+        cv2.fillConvexPoly(labels, np.round(vertices).astype("int32"), TABLE)
+
+        # Right side: the part of the frame on the Right of the projected net line.
+        (x0, y0), (x1, y1), (xr, yr) = self._table_to_image(
+            [[TABLE_LENGTH_CM / 2, 0], [TABLE_LENGTH_CM / 2, TABLE_WIDTH_CM],
+             [TABLE_LENGTH_CM, TABLE_WIDTH_CM / 2]])
+        a, b = y1 - y0, x0 - x1
+        c = -(a * x0 + b * y0)
+        if a * xr + b * yr + c < 0:
+            a, b, c = -a, -b, -c
+        right = _clip_half_plane([(0, 0), (w, 0), (w, h), (0, h)], (a, b, c))
+        if len(right) >= 3:
+            right_mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillConvexPoly(right_mask, np.round(right).astype("int32"), RIGHT)
+            labels |= right_mask
+
+        self.green_outline = np.round(green).astype("int32")
+        self.purple_outline = np.round(purple).astype("int32")
+
+    # --- LOOKUPS --- #
+    def label(self, point):
+        """Region label of an image point; OUT when the table is unknown or the point is off-frame."""
+        if self.labels is None:
+            return OUT
+        x, y = int(point[0]), int(point[1])
+        h, w = self.labels.shape
+        if not (0 <= x < w and 0 <= y < h):
+            return OUT
+        return int(self.labels[y, x])
+
+    def zone(self, point):
+        """Name of the zone an image point falls in (table, green_margin, purple_margin or out)."""
+        return ZONE_NAMES[self.label(point) & ZONE_MASK]
+
+    def side(self, point):
+        """Side of the net ("Left" or "Right") of an image point, or None if the table is unknown."""
+        if self.labels is None:
+            return None
+        x = min(max(int(point[0]), 0), self.labels.shape[1] - 1)
+        y = min(max(int(point[1]), 0), self.labels.shape[0] - 1)
+        return "Right" if self.labels[y, x] & RIGHT else "Left"
+
+    def to_table_cm(self, point):
+        """Table coordinates (cm from the top-left corner along length and width) of an image point."""
+        if self.homography is None:
+            return None
+        m = self.homography
+        x, y = float(point[0]), float(point[1])
+        d = m[2, 0] * x + m[2, 1] * y + m[2, 2]
+        return (float((m[0, 0] * x + m[0, 1] * y + m[0, 2]) / d),
+                float((m[1, 0] * x + m[1, 1] * y + m[1, 2]) / d))
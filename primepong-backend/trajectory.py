@@ -0,0 +1,177 @@
+import math
+import threading
+
+import numpy as np
+
+# --- CONFIGURATION --- #
+# Pixel values are at segmentation.REFERENCE_WIDTH and scale with the frame.
+HISTORY_CAPACITY = 1024      # Ball positions kept (about 8 s at 120 fps).
+VELOCITY_SMOOTHING = 0.5     # Weight of the newest finite difference in the smoothed velocity.
+MAX_GAP_SECONDS = 0.1        # A longer gap between sightings restarts the velocity estimate.
+RALLY_GAP_SECONDS = 1.5      # Ball unseen for this long ends the rally.
+BOUNCE_MIN_SPEED = 60.0      # Vertical pixels/s needed before and after a bounce (hysteresis).
+BOUNCE_ZONES = ("table", "green_margin")  # Zones a bounce can happen in, when the table is known.
+FLOOR_ZONES = ("out",)       # Zones where the same velocity flip is a bounce off the floor.
+
+# Columns of the history buffer.
+T, X, Y, TABLE_X, TABLE_Y = range(5)
+
+# --- TRAJECTORY CLASS --- #
+class Trajectory:
+    """
+    Fixed-capacity history of ball positions with incremental analytics.
+
+    Every sighting is written into a preallocated ring buffer (time, image
+    position, table position) and updates the analytics from the previous
+    sighting only: an exponentially smoothed velocity in image pixels/s and,
+    when the table is known, in table cm/s (the ball projected onto the table
+    plane). Nothing is recomputed over the history, so a frame costs the same
+    however long the rally is.
+
+    A bounce is the smoothed vertical image velocity turning from falling to
+    rising over the table; the same flip beyond the padded table is a floor
+    bounce. A rally starts at the first sighting and ends once
+    the ball is unseen for `rally_gap_seconds`.
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY, smoothing=VELOCITY_SMOOTHING,
+                 max_gap_seconds=MAX_GAP_SECONDS, rally_gap_seconds=RALLY_GAP_SECONDS):
+        self.smoothing = smoothing
+        self.max_gap_seconds = max_gap_seconds
+        self.rally_gap_seconds = rally_gap_seconds
+        self._buffer = np.full((capacity, 5), np.nan)
+        self._head = 0                # Next row to write.
+        self.count = 0                # Rows filled, up to capacity.
+        self._lock = threading.Lock()
+        self.last_bounce = None       # {"timestamp", "side", "ball_cm"} of the latest bounce.
+        self.last_floor_bounce = None  # Same, for the latest bounce off the floor.
+        self.last_rally = None        # Summary of the last finished rally.
+        self._clear_motion()
+        self._clear_rally()
+
+    def _clear_motion(self):
+        self.last_seen = None         # Timestamp of the last sighting.
+        self.velocity = None          # Smoothed image velocity, pixels/s, or None.
+        self.table_velocity = None    # Smoothed table velocity, cm/s, or None.
+        self._position = None
+        self._table_position = None
+        self._falling = False
+
+    def _clear_rally(self):
+        self.rally_start = None
+        self.rally_bounces = 0
+        self.rally_peak_speed = 0.0   # Highest table speed of the rally, cm/s.
+
+    @property
+    def speed(self):
+        """Smoothed ball speed over the table plane in cm/s, or None when unknown."""
+        if self.table_velocity is None:
+            return None
+        return math.hypot(*self.table_velocity)
+
+    # --- UPDATES --- #
+    def update(self, timestamp, center, scale=1.0, ball_cm=None, zone=None, side=None):
+        """
+        Feeds one frame's detection (center in frame pixels, or None when the
+        ball was not found). Returns "bounce" when a bounce on the table was
+        detected, "floor" for one off the floor, "rally" when the previous rally
+        just ended, otherwise None.
+        """
+        with self._lock:
+            ended = (self.rally_start is not None
+                     and timestamp - self.last_seen > self.rally_gap_seconds)
+            if ended:
+                self._end_rally()
+            if center is None:
+                return "rally" if ended else None
+
+            x, y = center[0] / scale, center[1] / scale
+            row = self._head
+            self._buffer[row, T] = timestamp
+            self._buffer[row, X] = x
+            self._buffer[row, Y] = y
+            self._buffer[row, TABLE_X] = ball_cm[0] if ball_cm is not None else np.nan
+            self._buffer[row, TABLE_Y] = ball_cm[1] if ball_cm is not None else np.nan
+            self._head = (row + 1) % len(self._buffer)
+            self.count = min(self.count + 1, len(self._buffer))
+
+            if self.rally_start is None:
+                self.rally_start = timestamp
+            kind = None
+            if self._update_motion(timestamp, x, y, ball_cm):
+                bounce = {"timestamp": timestamp, "side": side, "ball_cm": ball_cm}
+                if zone is None or zone in BOUNCE_ZONES:
+                    kind = "bounce"
+                    self.rally_bounces += 1
+                    self.last_bounce = bounce
+                elif zone in FLOOR_ZONES:
+                    kind = "floor"
+                    self.last_floor_bounce = bounce
+            self.last_seen = timestamp
+            self._position = (x, y)
+            self._table_position = ball_cm
+            if ended:
+                return "rally"
+            return kind
+
+    def _update_motion(self, timestamp, x, y, ball_cm):
+        """Updates the smoothed velocities from the previous sighting; returns True when the ball bounced."""
+        dt = timestamp - self.last_seen if self.last_seen is not None else None
+        if dt is None or dt <= 0 or dt > self.max_gap_seconds:
+            self.velocity = None
+            self.table_velocity = None
+            self._falling = False
+            return False
+
+        a = self.smoothing
+        vx = (x - self._position[0]) / dt
+        vy = (y - self._position[1]) / dt
+        if self.velocity is not None:
+            vx = a * vx + (1 - a) * self.velocity[0]
+            vy = a * vy + (1 - a) * self.velocity[1]
+        self.velocity = (vx, vy)
+
+        if ball_cm is not None and self._table_position is not None:
+            tx = (ball_cm[0] - self._table_position[0]) / dt
+            ty = (ball_cm[1] - self._table_position[1]) / dt
+            if self.table_velocity is not None:
+                tx = a * tx + (1 - a) * self.table_velocity[0]
+                ty = a * ty + (1 - a) * self.table_velocity[1]
+            self.table_velocity = (tx, ty)
+            self.rally_peak_speed = max(self.rally_peak_speed, math.hypot(tx, ty))
+        else:
+            self.table_velocity = None
+
+        # Image y grows downwards: falling is vy > 0.
+        if vy > BOUNCE_MIN_SPEED:
+            self._falling = True
+        elif vy < -BOUNCE_MIN_SPEED and self._falling:
+            self._falling = False
+            return True
+        return False
+
+    def _end_rally(self):
+        self.last_rally = {"started_at": self.rally_start, "ended_at": self.last_seen,
+                           "duration": self.last_seen - self.rally_start,
+                           "bounces": self.rally_bounces, "peak_speed_cm_s": self.rally_peak_speed}
+        self._clear_rally()
+        self._clear_motion()
+
+    # --- QUERIES --- #
+    def recent(self, n=None):
+        """Copy of the last n rows (oldest first) as an (n, 5) array of time, x, y, table x, table y."""
+        with self._lock:
+            n = self.count if n is None else max(0, min(n, self.count))
+            rows = (self._head - n + np.arange(n)) % len(self._buffer)
+            return self._buffer[rows]
+
+    def summary(self):
+        """Current motion and rally analytics as a JSON-friendly dict."""
+        with self._lock:
+            rally = None
+            if self.rally_start is not None:
+                rally = {"started_at": self.rally_start, "duration": self.last_seen - self.rally_start,
+                         "bounces": self.rally_bounces, "peak_speed_cm_s": self.rally_peak_speed}
+            return {"last_seen": self.last_seen, "velocity_px_s": self.velocity,
+                    "speed_cm_s": self.speed, "rally": rally, "last_rally": self.last_rally,
+                    "last_bounce": self.last_bounce}
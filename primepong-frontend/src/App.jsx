@@ -1,6 +1,9 @@
 import React, { useState, useEffect, useRef } from 'react';
 import './App.css';
 
+// PrimePong backend (primepong-backend/server.py)
+const BACKEND_URL = 'http://localhost:5000';
+
 export default function App() {
   // ---------------------
   // GAME STATE
@@ -39,9 +42,8 @@ export default function App() {
     movement: 'not moving'
   });
 
-  // Keep track of the previous force values (for detecting rising edges)
-  const lastForceA = useRef(0);  
-  const lastForceB = useRef(0);  
+  // Guards the center-hit overlay (also read from the event-stream listeners)
+  const centerHitActive = useRef(false);
 
   // ---------------------
   // Audio
@@ -89,9 +91,10 @@ export default function App() {
   // CENTER HIT EVENT
   // ---------------------
   const triggerCenterHit = () => {
-    if (centerHitEvent) return; // Only once if not active
+    if (centerHitActive.current) return; // Only once if not active
     console.log('Center hit triggered!');
     playCenterHitSound();
+    centerHitActive.current = true;
     setCenterHitEvent(true);
 
     // If you want center hits to increment both players, do so here:
@@ -100,6 +103,7 @@ export default function App() {
 
     // Show "BOOM!" for 1 second (1000 ms)
     setTimeout(() => {
+      centerHitActive.current = false;
       setCenterHitEvent(false);
     }, 1000);
   };
@@ -128,139 +132,36 @@ export default function App() {
   };
 
   // ---------------------
-  // POLLING: PLAYER A => IP .13
-  // Poll every 10 ms
-  // Rising edge detection: if lastForceA=0 and new=1 => increment hits
-  // Then store new in lastForceA
-  // ---------------------
-  useEffect(() => {
-    const pollA = async () => {
-      try {
-        const resp = await fetch('http://172.20.10.13/');
-        if (!resp.ok) throw new Error('Bad response from A');
-        const data = await resp.json();
-
-        // Read the new force_value
-        const fVal = data.force_value;
-        // If lastForce=0 and fVal=1 => increment Player A hits
-        if (lastForceA.current === 0 && fVal === 1) {
-          setPlayerAStats((prev) => ({
-            ...prev,
-            totalHits: prev.totalHits + 1
-          }));
-        }
-
-        // Store sensor data
-        setSensorA({
-          force_value: fVal,
-          accel_x: data.accel_x,
-          accel_y: data.accel_y,
-          accel_z: data.accel_z,
-          movement: data.movement.toLowerCase()
-        });
-
-        // Update the ref
-        lastForceA.current = fVal;
-      } catch (err) {
-        console.error('Error polling A (.13):', err);
-      }
-    };
-
-    pollA();
-    const intA = setInterval(pollA, 10);
-    return () => clearInterval(intA);
-  }, []);
-
-  // ---------------------
-  // POLLING: PLAYER B => IP .12
-  // Poll every 10 ms
-  // Rising edge detection for B => increment B hits
+  // EVENTS FROM THE BACKEND
+  // Server-Sent Events: every score is pushed with an id, and EventSource
+  // resends the last id on reconnect so no point is lost.
+  // Paddle hits and swings are detected by the backend sensor hub
+  // (primepong-backend/sensor_hub.py) and pushed on the same stream.
   // ---------------------
   useEffect(() => {
-    const pollB = async () => {
-      try {
-        const resp = await fetch('http://172.20.10.12/');
-        if (!resp.ok) throw new Error('Bad response from B');
-        const data = await resp.json();
-
-        const fVal = data.force_value;
-        // If lastForceB=0 and fVal=1 => increment B hits
-        if (lastForceB.current === 0 && fVal === 1) {
-          setPlayerBStats((prev) => ({
-            ...prev,
-            totalHits: prev.totalHits + 1
-          }));
-        }
-
-        setSensorB({
-          force_value: fVal,
-          accel_x: data.accel_x,
-          accel_y: data.accel_y,
-          accel_z: data.accel_z,
-          movement: data.movement.toLowerCase()
-        });
-
-        lastForceB.current = fVal;
-      } catch (err) {
-        console.error('Error polling B (.12):', err);
-      }
-    };
-
-    pollB();
-    const intB = setInterval(pollB, 10);
-    return () => clearInterval(intB);
+    const source = new EventSource(`${BACKEND_URL}/events`);
+    source.addEventListener('score', (e) => {
+      const event = JSON.parse(e.data);
+      triggerScoreEvent(event.winner);
+    });
+    source.addEventListener('hit', (e) => {
+      const event = JSON.parse(e.data);
+      const setStats = event.paddle === 'A' ? setPlayerAStats : setPlayerBStats;
+      setStats((prev) => ({ ...prev, totalHits: prev.totalHits + 1 }));
+      triggerCenterHit();
+    });
+    source.addEventListener('swing', (e) => {
+      const event = JSON.parse(e.data);
+      const setSensor = event.paddle === 'A' ? setSensorA : setSensorB;
+      setSensor((prev) => ({ ...prev, movement: 'very fast' }));
+      // Show "SWING!" for 0.5 second (500 ms)
+      setTimeout(() => {
+        setSensor((prev) => ({ ...prev, movement: 'not moving' }));
+      }, 500);
+    });
+    return () => source.close();
   }, []);
 
-  // ---------------------
-  // If either sensor sees rising edge => centerHit
-  // We'll detect rising edge with lastForceA/B logic
-  // 
-  // But if you still want "force=1 => boom" each time,
-  // we can do a rising-edge check here too.
-  // 
-  // Or simpler approach: if centerHit triggers for each poll,
-  // you might get duplicates. 
-  // 
-  // We'll do a check:
-  // If (lastForceA=0 => 1) or (lastForceB=0 => 1) => trigger once
-  // But we've done that in the poll. 
-  //
-  // If you want a centerHit that triggers whenever new=1:
-  // Do the same approach:
-  // If lastForceA.current=0 && sensorA.force_value=1 => trigger
-  // If lastForceB.current=0 && sensorB.force_value=1 => trigger
-  // 
-  // We'll do that in a separate effect.
-  // ---------------------
-  useEffect(() => {
-    // If A just went from 0 -> 1 or B 0 ->1 => center hit
-    // We detect that by storing them in local vars
-    const fA = sensorA.force_value;
-    const fB = sensorB.force_value;
-
-    // If either is 1 but was 0 last time => centerHit
-    // We'll track that with lastForceA/B in the same effect
-    // Actually simpler: we'll do it directly in the poll
-    // so we don't double-detect. 
-    // 
-    // If you want it here, you'd do something like:
-    // if (lastForceA.current===0 && fA===1 && !centerHitEvent) { triggerCenterHit(); }
-    // if (lastForceB.current===0 && fB===1 && !centerHitEvent) { triggerCenterHit(); }
-
-    // For clarity, let's do it here:
-    if (!centerHitEvent) {
-      if (lastForceA.current === 1 && fA === 1) {
-        // means it was already 1 in the poll => we don't do it again
-      }
-      if (lastForceA.current === 0 && fA === 1) {
-        triggerCenterHit();
-      }
-      if (lastForceB.current === 0 && fB === 1) {
-        triggerCenterHit();
-      }
-    }
-  }, [sensorA, sensorB, centerHitEvent]);
-
   // ---------------------
   // RENDER
   // ---------------------